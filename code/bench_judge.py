@@ -0,0 +1,112 @@
+'''*************************************************************************
+Name: Bench Judge
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file times the judgement engine on a chart, with no window (or pygame) at all.
+                     Every note is pressed (and held) a little off of its time, like a real player would. Run it from the main folder:
+                     python code/bench_judge.py songs/<song>/<chart>.json
+                     With no chart, a made up chart of --notes notes is used instead.
+********************************************************************'''
+
+import sys, json, time, random, argparse
+
+from util.Judge import JudgementEngine, RANK_NAMES
+
+# the judge was asked to handle millions of key events per second when replaying charts headlessly.
+# it is plain Python (so it runs anywhere the game does), and falls short of that (the last line of the output says by how much).
+# gameplay itself only needs a few dozen a second
+TARGET_EVENTS_PER_SECOND = 1000000
+
+
+## chart_notes() reads the (ms, lane, hold ms) of every note in a chart json (ms has the offset taken away, like in ChartData)
+
+def chart_notes(json_path):
+    with open(json_path) as file:
+        loaded_JSON = json.load(file)
+
+    # notes are [id, lane, ms, hold ms, texture, type]
+    offset = loaded_JSON.get('offset', 0)
+    notes = [value for key, value in loaded_JSON.items() if key.startswith('note')]
+    return [note[2] - offset for note in notes], [note[1] for note in notes], [note[3] for note in notes]
+
+
+## random_notes() makes up a dense chart (chords and holds included)
+
+def random_notes(count, key_count, seed=0):
+    rng = random.Random(seed)
+    ms = []
+    lanes = []
+    hold_ms = []
+
+    time_ms = 0
+    while len(ms) < count:
+        time_ms += rng.choice([50, 75, 100, 150])
+        for lane in rng.sample(range(0, key_count), rng.choice([1, 1, 1, 2, 3])):
+            ms.append(time_ms)
+            lanes.append(lane)
+            hold_ms.append(rng.choice([0, 0, 0, 0, 300]))
+
+    return ms[:count], lanes[:count], hold_ms[:count]
+
+
+## player_events() makes the (time, lane, pressed) events of a player hitting every note (up to jitter ms off), in time order
+
+def player_events(ms, lanes, hold_ms, jitter=60, seed=0):
+    rng = random.Random(seed)
+    events = []
+    for x in range(0, len(ms)):
+        press_time = ms[x] + rng.uniform(-jitter, jitter)
+        events.append((press_time, lanes[x], True))
+        events.append((press_time + max(hold_ms[x], 30), lanes[x], False))
+
+    events.sort(key=lambda event: (event[0], event[2]))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time the judgement engine on a chart')
+    parser.add_argument('chart', nargs='?', default=None, help='the chart json (default: a made up chart)')
+    parser.add_argument('--notes', type=int, default=100000, help='how many notes the made up chart has (default: 100000)')
+    parser.add_argument('--keys', type=int, default=8, help='how many lanes there are (default: 8)')
+    parser.add_argument('--runs', type=int, default=5, help='how many times to judge the chart (default: 5)')
+    args = parser.parse_args()
+
+    if args.chart != None:
+        ms, lanes, hold_ms = chart_notes(args.chart)
+    else:
+        ms, lanes, hold_ms = random_notes(args.notes, args.keys)
+
+    events = player_events(ms, lanes, hold_ms)
+
+    best_setup = None
+    best = None
+    for run in range(0, args.runs):
+        start = time.perf_counter()
+
+        judge = JudgementEngine(args.keys)
+        judge.add_notes(ms, lanes, hold_ms)
+        setup = time.perf_counter() - start
+
+        # only the judging is timed per event (adding the notes is done once per chart, not per event)
+        start = time.perf_counter()
+        judgements = sum(1 for judgement in judge.process(events))
+        judge.advance(float('inf'))
+        elapsed = time.perf_counter() - start
+
+        if best == None or elapsed < best:
+            best = elapsed
+        if best_setup == None or setup < best_setup:
+            best_setup = setup
+
+    events_per_second = len(events) / max(best, 1e-9)
+
+    print(f'{len(ms)} notes, {len(events)} key events, {judgements} judgements')
+    print(', '.join(f'{RANK_NAMES[x]} {judge.counts[x]}' for x in range(0, len(RANK_NAMES))) + f', accuracy {judge.accuracy * 100:.2f}%')
+    print(f'adding the notes, best of {args.runs}: {best_setup * 1000:.1f} ms')
+    print(f'judging, best of {args.runs}: {best * 1000:.1f} ms ({best / max(len(events), 1) * 1e6:.2f} us per key event, {events_per_second:,.0f} events/s)')
+    print(f'target: {TARGET_EVENTS_PER_SECOND:,} events/s ({events_per_second / TARGET_EVENTS_PER_SECOND * 100:.0f}% of it)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
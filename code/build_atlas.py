@@ -0,0 +1,17 @@
+'''*************************************************************************
+Name: Build Atlas
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file packs the textures in '/assets' into the texture atlas (assets/atlas.png + assets/atlas.json).
+                     Run it from the main folder (like the game) whenever a texture is added or changed:
+                     python code/build_atlas.py
+********************************************************************'''
+
+import pygame
+
+from util.Atlas import build_atlas
+
+if __name__ == '__main__':
+    pygame.init()
+    build_atlas()
+    pygame.quit()
@@ -0,0 +1,120 @@
+'''*************************************************************************
+Name: Compile Charts
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file checks every chart in '/songs' and compiles it, so the game never has to read or check chart json while playing.
+                     Charts are sorted into hit order before they are compiled. Each chart is done in its own process, so the whole
+                     library is done at once. Run it from the main folder (like the game) whenever a chart is added or changed:
+                     python code/compile_charts.py
+                     Add --check to only check the charts (nothing is saved), or --force to compile charts that are already up to date.
+********************************************************************'''
+
+import os, sys, json, hashlib, argparse, configparser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from util.ChartData import ChartData, ChartCache, compile_chart, compiled_is_current, source_stamp
+
+
+## compile_song_chart() checks one chart json, and compiles it if nothing is wrong with it. (runs in a worker process)
+# returns (json path, note count, list of problems, list of notes, was it compiled?). charts with problems are not compiled
+#   json path (path of the chart json)
+#   chart path (where to save the compiled chart)
+#   check only (only check the chart, don't save anything)
+#   force (compile it even if the compiled chart is up to date)
+
+def compile_song_chart(json_path, chart_path, check_only=False, force=False):
+    try:
+        stamp = source_stamp(json_path)
+        with open(json_path, 'rb') as file:
+            source = file.read()
+
+        chart = ChartData.from_json(json.loads(source))
+
+    except (OSError, ValueError, IndexError, KeyError, TypeError, AttributeError) as error:
+        return json_path, 0, [f'could not be read ({error})'], [], False
+
+    problems = chart.validate()
+
+    # charts that are out of order are still fine to play once they are sorted
+    notes = []
+    if not chart.is_sorted():
+        notes.append('is out of order (it is sorted when compiled)')
+
+    # up to date if the compiled chart was made from this exact json
+    source_hash = hashlib.sha256(source).digest()
+    if len(problems) > 0 or check_only or (not force and compiled_is_current(json_path, chart_path, None, source_hash)):
+        return json_path, chart.count, problems, notes, False
+
+    try:
+        compile_chart(chart.sorted(), chart_path, source_hash, stamp)
+    except OSError as error:
+        return json_path, chart.count, [f'could not be compiled ({error})'], notes, False
+
+    return json_path, chart.count, problems, notes, True
+
+
+## find_charts() finds every chart json in the songs folder. returns (list of chart paths, list of problems with the songs)
+
+def find_charts(songs_folder):
+    chart_paths = []
+    problems = []
+
+    for song_name in sorted(os.listdir(songs_folder)):
+        song_folder = os.path.join(songs_folder, song_name)
+        if not os.path.isdir(song_folder):
+            continue
+
+        # the game plays songs/<song>/<song>.mp3
+        if not os.path.isfile(os.path.join(song_folder, song_name + '.mp3')):
+            problems.append(f'{song_folder}: is missing {song_name}.mp3')
+
+        charts = [os.path.join(song_folder, file) for file in sorted(os.listdir(song_folder)) if file.endswith('.json')]
+        if len(charts) == 0:
+            problems.append(f'{song_folder}: has no charts')
+
+        chart_paths += charts
+
+    return chart_paths, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='check and compile every chart in the songs folder')
+    parser.add_argument('--songs', default='songs', help='the songs folder (default: songs)')
+    parser.add_argument('--check', action='store_true', help='only check the charts, don\'t compile them')
+    parser.add_argument('--force', action='store_true', help='compile charts even if they are already up to date')
+    parser.add_argument('--workers', type=int, default=None, help='how many processes to use (default: one per cpu)')
+    args = parser.parse_args()
+
+    # save compiled charts where the game looks for them
+    p_settings = configparser.RawConfigParser()
+    p_settings.read('config/player_settings.ini')
+    cache = ChartCache(p_settings.get('Extra', 'chart cache folder', fallback=''))
+
+    chart_paths, problems = find_charts(args.songs)
+    compiled = 0
+
+    with ProcessPoolExecutor(args.workers) as executor:
+        futures = [executor.submit(compile_song_chart, path, cache.compiled_path(path), args.check, args.force) for path in chart_paths]
+
+        for future in as_completed(futures):
+            json_path, note_count, chart_problems, notes, was_compiled = future.result()
+            problems += [f'{json_path}: {problem}' for problem in chart_problems]
+
+            for note in notes:
+                print(f'{json_path}: {note}')
+
+            if was_compiled:
+                compiled += 1
+                print(f'compiled {json_path} ({note_count} notes)')
+
+    for problem in problems:
+        print(problem)
+
+    print(f'checked {len(chart_paths)} charts, compiled {compiled}, found {len(problems)} problems')
+
+    # so scripts can tell if something is wrong
+    return 1 if len(problems) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,20 +11,27 @@ import os, math, operator, random, time, json, configparser, webbrowser
 import pygame
 import tween
 
-from util.Classes import Timer, Image, Text, Button, TextInput, Transition
-from util.Game import BG, Receptor, Note, HoldNote, Song
-from util.Game import calc_note_data, play_intro, fps_display, song_data_display, song_hit_data_display
-from util.Util import is_dark, compare_from_range, exit
+from util.Classes import Timer, LaneKeys, Image, Text, Button, TextInput, Transition, TEXTURES
+from util.Judge import JudgementEngine, MISS
+from util.Game import BG, Receptor, Note, NoteList, HoldNote, Song, bake_hold_sprites
+from util.ChartData import CHARTS
+from util.Game import show_judgement, play_intro, fps_display, song_data_display, song_hit_data_display
+from util.Util import is_dark, exit
 from util.Option import Option
 from util.Chart import ChartGrid, ChartNote, ChartHoldNote
-from util.Chart import save_json, chart_note_data_display
+from util.Chart import save_json, chart_note_data_display, CHART_SAVER
 from util.Freeplay import FreeplaySong
 from util.List import SongList
+from util.Sound import SOUNDS
+from util.Render import DirtyRenderer, SpriteBatch, StaticLayer
 
 # pygame setup
 pygame.init()
 pygame.font.init()
 
+# load every sound effect once, and reserve mixer channels for them
+SOUNDS.load()
+
 # setup the config parser. It loads the player_settings.ini file in '/config' and loads, as it says, settings.
 p_settings = configparser.RawConfigParser()
 p_settings.read_file(open('config/player_settings.ini'))
@@ -126,6 +133,7 @@ def intro_main():
     
     # create logo image
     intro_logo = Image('pygame', 0, 0, 0.3)
+    intro_logo.image = intro_logo.image.copy() # the logo fades out (gets filled), so don't touch the shared texture
     intro_logo.ypos = 250
     intro_logo.xpos = 400
     
@@ -167,7 +175,7 @@ def intro_main():
         if round(intro_timer.dt, 2) == 0.42 and intro_sound:
             print('bro')
             intro_sound = False
-            pygame.mixer.Sound('sounds/intro.wav').play()
+            SOUNDS.play('intro')
         
         # draw logo at correct time
         if intro_timer.dt > 0.4 and  intro_timer.dt < 1.7:
@@ -184,9 +192,11 @@ def intro_main():
         # fade out assets
         if intro_timer.dt > 1.5:
             intro_logo.image.fill((225, 225, 225), special_flags=pygame.BLEND_MULT)
+            intro_logo.scaled.invalidate()
             
         if intro_timer.dt > 4.6:
             intro_text.image.fill((225, 225, 225), special_flags=pygame.BLEND_MULT)
+            intro_text.scaled.invalidate()
         
         # update display
         pygame.display.update()
@@ -277,6 +287,9 @@ def list_main(transition):
     ev_y = 0
     is_open = []
     
+    # setup the renderer. if dirty rect rendering is on, the menu is only pushed to the display when something happens
+    renderer = DirtyRenderer(p_settings.getboolean('Visual', 'dirty rect rendering'), DISPLAYSURF.get_rect())
+    
     ## loop
     while (1):
         
@@ -420,8 +433,12 @@ def list_main(transition):
         elif transition.halfway and started_from_here and loading_list:
             gameplay_main(None, None, list_to_load, -1, False, 'list', transition)
         
+        # nothing moves in the menus unless there is input (hovering, scrolling, clicking) or a transition, so push the whole screen then
+        if len(event_list) > 0 or transition.transitioning:
+            renderer.full()
+        
         # update app display
-        pygame.display.update()
+        renderer.present()
         
         # update window name
         pygame.display.set_caption(display_string)
@@ -472,6 +489,9 @@ def freeplay_main(transition):
     # set window name
     display_string = f'Py-Mania - In The Menus'
     
+    # setup the renderer. if dirty rect rendering is on, the menu is only pushed to the display when something happens
+    renderer = DirtyRenderer(p_settings.getboolean('Visual', 'dirty rect rendering'), DISPLAYSURF.get_rect())
+    
     ## loop
     while (1):
         
@@ -564,8 +584,12 @@ def freeplay_main(transition):
         elif transition.halfway and started_from_here and loading_song:
             gameplay_main(song_to_load, chart_to_load, None, 0, False, 'freeplay', transition)
         
+        # nothing moves in the menus unless there is input (hovering, scrolling, clicking) or a transition, so push the whole screen then
+        if len(event_list) > 0 or transition.transitioning:
+            renderer.full()
+        
         # update app display
-        pygame.display.update()
+        renderer.present()
         
         # update window name
         pygame.display.set_caption(display_string)
@@ -635,6 +659,9 @@ def chart_main(song_to_load, chart_to_load, transition):
         DISPLAYSURF.blit(recep.image, receptor_xy[x])
         
     recep_timer = Timer(0)
+    
+    # tint and rotate every hold sprite once (editor holds are rotated differently, see ChartHoldNote)
+    bake_hold_sprites([-receptors.get(f'receptor{x}').angle + 135 for x in range(0, key_count)], list(map(int, p_settings.get('Visual', 'note colour').split())))
             
     # load song
     if song_to_load == None:
@@ -704,22 +731,23 @@ def chart_main(song_to_load, chart_to_load, transition):
     # get keybinds from config
     keybinds = list(map(str, p_settings.get('Gameplay', 'keybindings').split()))
     
+    # resolve them to lanes once (see LaneKeys)
+    lane_keys = LaneKeys(keybinds)
+    
     # setup chart notes
     note_list = []
     
     # if there is a song to load, parse the JSON of the chart and create a list of notes to load into the editor.
     if song_to_load != None:
         if os.path.exists(f'songs/{current_song.name}/{chart_to_load}.json'):
-            chart_JSON = open(f'songs/{current_song.name}/{chart_to_load}.json', 'r')
-            string_JSON = chart_JSON.read()
-            loaded_JSON = json.loads(string_JSON)
+            # (loads the compiled chart if there is one, see load_chart)
+            CHARTS.cache_folder = p_settings.get('Extra', 'chart cache folder', fallback='')
+            chart_data = CHARTS.load(f'songs/{current_song.name}/{chart_to_load}.json')
             
-            # for each note in loaded json, add it to note list
-            for x in range(0, len(loaded_JSON)-1):
-                print(loaded_JSON[f'note{x}'])
-                
-                note = loaded_JSON.get(f'note{x}')
-                note_list.append(ChartNote(note[0], receptors, note[1], note_spawn_pos[note[1]], note[2] - (loaded_JSON['offset']), note[3], note[4].replace('"', ''), 0.5, note[5], current_song))
+            # for each note in the chart, add it to note list
+            for x in range(0, len(chart_data)):
+                lane = int(chart_data.lane[x])
+                note_list.append(ChartNote(int(chart_data.id[x]), receptors, lane, note_spawn_pos[lane], float(chart_data.ms[x]), float(chart_data.hold_ms[x]), chart_data.texture(x), 0.5, chart_data.type(x), current_song))
 
 
     # setup HUD
@@ -771,6 +799,10 @@ def chart_main(song_to_load, chart_to_load, transition):
 
     # for timing, create just_saved variable
     just_saved = False
+    
+    # autosave timer starts when the editor is opened (see ChartSaver)
+    autosave_minutes = p_settings.getint('Chart Editor', 'autosave minutes', fallback=0)
+    CHART_SAVER.last_save = time.time()
 
     # the box that appears when a note is selected
     note_data_box = Image('info_box', -430, 170, 0.75)
@@ -824,15 +856,16 @@ def chart_main(song_to_load, chart_to_load, transition):
         # if beat has changed, play metronome (if active)
         if metronome:
             if prev_beat != cur_beat:
-                pygame.mixer.Sound('sounds/metronome.wav').play()
+                SOUNDS.play('metronome')
 
         # for metronome setup
         prev_beat = cur_beat
 
         event_list = pygame.event.get()
         for event in event_list:
-            # quit
+            # quit (once any saves that are still being written are done, so they aren't lost)
             if event.type == pygame.QUIT:
+                CHART_SAVER.wait()
                 exit()
 
             elif event.type == pygame.KEYDOWN:
@@ -851,20 +884,17 @@ def chart_main(song_to_load, chart_to_load, transition):
                 if current_song != None:
 
                     # receptor inputs
-                    for x in range(0, key_count):
-                        # get the hit key and convert it into a string that is it's name
-                        key_pressed = pygame.key.name(event.key).replace("'", '').replace('[', '').replace(']', '')
-
-                        # compare key name to the one saved in the keybinds list loaded from config
-                        if key_pressed == keybinds[x]:
-                            if p_settings.getboolean('Chart Editor', 'type to chart'):
-                                print(current_song.playing)
-                                if current_song.playing:
-                                
-                                    if hitsounds:
-                                        pygame.mixer.Sound('sounds/hitsound.wav').play()
-                                    # p_settings.getfloat('Gameplay', 'global offset')
-                                    note_list.append(ChartNote(len(note_list)+1, receptors, x, note_spawn_pos[x], current_ms, 0, 'note', 0.5, '', current_song))
+                    # which lane the key is bound to (see LaneKeys)
+                    x = lane_keys.lane(event)
+                    if x != None:
+                        if p_settings.getboolean('Chart Editor', 'type to chart'):
+                            print(current_song.playing)
+                            if current_song.playing:
+                            
+                                if hitsounds:
+                                    SOUNDS.play('hitsound')
+                                # p_settings.getfloat('Gameplay', 'global offset')
+                                note_list.append(ChartNote(len(note_list)+1, receptors, x, note_spawn_pos[x], current_ms, 0, 'note', 0.5, '', current_song))
 
                     # if space is hit, pause or unpause the song (if you are not typing into a box at the moment)
                     if event.key == pygame.K_SPACE:
@@ -883,13 +913,13 @@ def chart_main(song_to_load, chart_to_load, transition):
                         if metronome_box.rect.collidepoint(mpos):
                             metronome = not metronome
                             # play interaction sound
-                            pygame.mixer.Sound('sounds/interact.wav').play()
+                            SOUNDS.play('interact')
                             print(metronome)
 
                         elif hitsound_box.rect.collidepoint(mpos):
                             hitsounds = not hitsounds
                             # play interaction sound
-                            pygame.mixer.Sound('sounds/interact.wav').play()
+                            SOUNDS.play('interact')
                             print(hitsounds)
 
                         elif save_button.rect.collidepoint(mpos) and current_song != None:
@@ -981,7 +1011,7 @@ def chart_main(song_to_load, chart_to_load, transition):
                 
                 # run hitsounds
                 if round(note.calc, 2) == 0.88 and hitsounds and current_song.playing:
-                    pygame.mixer.Sound('sounds/hitsound.wav').play()
+                    SOUNDS.play('hitsound')
 
         # update HUD
         if p_settings.getboolean('Chart Editor', 'show song data'):
@@ -1007,9 +1037,12 @@ def chart_main(song_to_load, chart_to_load, transition):
             hitsound_box = hitsound_box_uncheck
         hitsound_box.draw(DISPLAYSURF)
 
-        # if a song is loaded, update save button
+        # if a song is loaded, update save button (and autosave if it's time to)
         if current_song != None:
             save_button.update(event_list, DISPLAYSURF, save_json, note_list, [current_song, chart_name_field.saved_var])
+            
+            if chart_name_field.saved_var != '':
+                CHART_SAVER.autosave(note_list, [current_song, chart_name_field.saved_var], autosave_minutes)
 
         # update load button. put load_json as the func argument and put a list of data as the argument for the function
         load_button.update(event_list, DISPLAYSURF, load_json, 'chart', [load_field.saved_var, chart_name_field.saved_var, transition])
@@ -1053,8 +1086,9 @@ def chart_main(song_to_load, chart_to_load, transition):
             transition.image.draw(DISPLAYSURF)
             tween.update(global_clock.get_time() / 1500)
         
-        # go back to title screen
+        # go back to title screen (finish saving first, the game can be closed from anywhere after this)
         if transition.halfway and started_from_here:
+            CHART_SAVER.wait()
             main('title', transition)
             
         # update app display
@@ -1129,6 +1163,9 @@ def title_main(transition):
     # get fps from config
     fps = p_settings.getint('Gameplay', 'fps limit')
 
+    # setup the renderer. if dirty rect rendering is on, the menu is only pushed to the display when something happens
+    renderer = DirtyRenderer(p_settings.getboolean('Visual', 'dirty rect rendering'), DISPLAYSURF.get_rect())
+    
     ## loop
     while(1):
         # FPS limit
@@ -1220,8 +1257,12 @@ def title_main(transition):
         if screen_transition.halfway and started_from_here:
             main(mode_to_switch, screen_transition)
         
+        # nothing moves in the menus unless there is input (hovering, scrolling, clicking) or a transition, so push the whole screen then
+        if len(event_list) > 0 or screen_transition.transitioning:
+            renderer.full()
+        
         # update display
-        pygame.display.update()
+        renderer.present()
         
         # update window name
         pygame.display.set_caption(display_string)
@@ -1270,11 +1311,13 @@ def options_main(transition):
     options.append(Option('Visual', 'Timebar Colour', 'Set Timebar fill colour.', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'colour'))
     options.append(Option('Visual', 'Auto-Swap Receptor Skin', 'If checked, when BG is dark, auto-swap the\ntexture of the receptors from light to dark.', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
     options.append(Option('Visual', 'Receptor Skin', 'If Auto-Swapping is disabled, set which\nreceptor skin to use.\n0 = Light\n1 = Dark', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'int', 0, 1))
+    options.append(Option('Visual', 'Dirty Rect Rendering', 'Only update the parts of the screen that\nchanged each frame.\n(Can help on slower computers.)', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
     
     options.append(Option('Chart Editor', None, '', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'header'))
     options.append(Option('Chart Editor', 'Show Song Data', 'Show song title, BPM, and length?', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
     options.append(Option('Chart Editor', 'Show Extra Data', "Shows currently selected note's data on screen.", 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
     options.append(Option('Chart Editor', 'Type to Chart', "Allows keyboard input to place notes if checked.", 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
+    options.append(Option('Chart Editor', 'Autosave Minutes', "Save the chart every few minutes.\n(0 = autosave is off)", 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'int', 0, 60))
     
     options.append(Option('Debug', None, '', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'header'))
     options.append(Option('Debug', 'Debug Mode', 'Show current Beat, Step, and MS.', 5, options[len(options) - 1].text.rect.midbottom[1] + offset, DISPLAYSURF, 'bool'))
@@ -1293,6 +1336,9 @@ def options_main(transition):
     # get fps from config
     fps = p_settings.getint('Gameplay', 'fps limit')
     
+    # setup the renderer. if dirty rect rendering is on, the menu is only pushed to the display when something happens
+    renderer = DirtyRenderer(p_settings.getboolean('Visual', 'dirty rect rendering'), DISPLAYSURF.get_rect())
+    
     ## loop
     while(1):
         
@@ -1402,8 +1448,12 @@ def options_main(transition):
         if transition.halfway and started_from_here:
             main('title', transition)
         
+        # nothing moves in the menus unless there is input (hovering, scrolling, clicking) or a transition, so push the whole screen then
+        if len(event_list) > 0 or transition.transitioning:
+            renderer.full()
+        
         # update display       
-        pygame.display.update()
+        renderer.present()
         
         # update window name
         pygame.display.set_caption(display_string)
@@ -1442,6 +1492,9 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         receptor_texture = recep.texture_string
         DISPLAYSURF.blit(recep.image, receptor_xy[x])
     
+    # tint and rotate every hold sprite once, before the notes are loaded
+    bake_hold_sprites([receptors.get(f'receptor{x}').angle for x in range(0, key_count)], list(map(int, p_settings.get('Visual', 'note colour').split())))
+    
     # grab keybinds from player_settings
     keybinds = list(map(str, p_settings.get('Gameplay', 'keybindings').split()))
     
@@ -1452,6 +1505,9 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         
     print(keybinds)
     
+    # resolve them to lanes once, so a key press is just one lookup (see LaneKeys)
+    lane_keys = LaneKeys(keybinds)
+    
     # setup song ms values
     start_ms = pygame.time.get_ticks()
     current_ms = -500
@@ -1480,33 +1536,40 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
     cur_beat = None
     time_prog = 0
     
-    # then, notes are added into a list to be loaded later
-    note_list = {}
-    
-    # open chart json
+    # find chart json
     if chart_to_load == None:
         
         # if list, load the [song name, chart name] portion of the current song in the 2d array
         #                               ~~^^^^^^~~
         
-        chart_JSON = open(f'songs/{current_song.name}/{list_to_load[current_list_song][1]}.json', 'r')
+        chart_path = f'songs/{current_song.name}/{list_to_load[current_list_song][1]}.json'
             
     else:
         
         # else, load provided json
-        chart_JSON = open(f'songs/{current_song.name}/{chart_to_load}.json', 'r')
+        chart_path = f'songs/{current_song.name}/{chart_to_load}.json'
+    
+    # load the chart into columns of note data (see ChartData). if the chart has been compiled, the compiled one is loaded (no json parsing)
+    # if the chart was already loaded (restarting, next time it's played, etc.), the cached one is used (see ChartCache)
+    # if not, the json is read on another thread and the notes are added to chart_data as they are read (see ChartStream)
+    CHARTS.cache_folder = p_settings.get('Extra', 'chart cache folder', fallback='')
+    chart_stream = CHARTS.stream(chart_path)
+    chart_data = chart_stream.chart
+    chart_data.init_beats(current_song.sec_per_beat, current_song.sec_per_step)
+    
+    # only wait for the start of the chart, the rest is added during the song
+    chart_stream.wait(chart_stream.batch_size)
     
-    # load json in string mode (load's', as in load string)
-    string_JSON = chart_JSON.read()
-    loaded_JSON = json.loads(string_JSON)
+    # note sprites are made once the notes are close enough to be shown, and let go once they are judged (see NoteList)
+    # note_list[x] is the sprite of chart_data index x
+    note_list = NoteList(chart_data, receptors, current_song)
     
-    # same as chart editor, convert note data in json into a list of notes to load in the game
-    for x in range(0, len(loaded_JSON)-1):
-        note = loaded_JSON.get(f'note{x}')
-        note_list[f'note{x}'] = Note(note[0], receptors, note[1], note[2] - loaded_JSON['offset'], note[3], note[4].replace('"', ''), note[5], current_song)
+    # the judge decides what was hit, held, and missed (see JudgementEngine). notes are missed once they go past the end of the lane (calc 1)
+    judge = JudgementEngine.from_chart(chart_data, key_count, (1 - 0.87) * current_song.beats_shown * current_song.sec_per_beat * 1000)
         
     print()
-    print('Amount of notes:', len(note_list))
+    print('Amount of notes:', len(note_list), '' if chart_stream.finished else '(so far, still reading the chart)')
+    print('Texture cache:', TEXTURES.stats())
     
     # an array containing 8 seperate timers (for each receptor. lets hold timers overlap.)
     recep_timers = []
@@ -1528,9 +1591,34 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
     display_box = Image('display_box', 0, -90, 0.65)
     note_dat_box = Image('big_box', 1135, centerY - 85, 0.8, 'center')
     
-    # setup the first note to hit
-    cur_note = 0
-    cur_hit_notes = []
+    # the static layers. everything that doesn't move is drawn to these once, instead of every frame.
+    # the underlay goes under the notes (background + receptors), and the overlay goes over them (HUD boxes + timebar background)
+    underlay = StaticLayer(DISPLAYSURF.get_size())
+    overlay = StaticLayer(DISPLAYSURF.get_size())
+    
+    def build_underlay(surf):
+        background.update(surf)
+        for x in range(0, key_count):
+            receptors.get(f'receptor{x}').draw_base(surf, receptor_xy[x])
+        return [surf.get_rect()]
+    
+    def build_overlay(surf):
+        rects = [pygame.draw.rect(surf, (0, 0, 0), pygame.Rect(0, 715, 1280, 50))] # timebar background
+        
+        # the HUD text is drawn inside of these boxes, so the box rects cover it for dirty rect rendering
+        if p_settings.getboolean('Visual', 'show app data'):
+            rects.append(fps_box.draw(surf))
+            
+        # always display accuracy
+        rects.append(acc_box.draw(surf))
+        
+        if p_settings.getboolean('Debug', 'debug mode'):
+            rects.append(display_box.draw(surf))
+        
+        if p_settings.getboolean('Visual', 'extra info'):
+            rects.append(note_dat_box.draw(surf))
+        
+        return rects
     
     # now that everything else is setup, I want to setup all of the bars and HUD assets
     
@@ -1544,10 +1632,7 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
     
     # gameplay variables
     
-    # this is used to store how many of each note you have hit.
-    # perfect, great, good, bad, miss
-    accuracy_ranks = [0, 0, 0, 0, 0]
-    average_acc = 0
+    # how many of each note you have hit, and your accuracy, are kept by the judge's score (judge.score)
     
     # setup the gameplay intro, to give the player time to be ready
     intro_assets = []
@@ -1578,6 +1663,12 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
     # set app caption
     display_string = f'Py-Mania - {current_song.info.tag.artist} - {current_song.info.tag.title}'
     
+    # setup the renderer. if dirty rect rendering is on, only the parts of the screen that changed are pushed to the display
+    renderer = DirtyRenderer(p_settings.getboolean('Visual', 'dirty rect rendering'), DISPLAYSURF.get_rect())
+    
+    # receptors and notes are collected here every frame, and drawn with a single blits() call
+    sprite_batch = SpriteBatch()
+    
     ### gameplay loop
     while(1):
            
@@ -1605,17 +1696,10 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         # clear screen
         DISPLAYSURF.fill(0)
         
-        # note list stuff
-        # this if fixes a bug that happens when a holding note is the last note in a song
-        if not note_list.get(f'note{cur_note}').actually_hit:
-        
-            # add the current 'note to hit' to the note list if it is not already there
-            if cur_hit_notes.count(note_list.get(f'note{cur_note}')) == 0 and cur_hit_notes.count(note_list.get(f'note{cur_note}')) < 1:
-                cur_hit_notes.append(note_list.get(f'note{cur_note}'))
-            
-            # check the next note to see it if it a double, triple, quadruple, etc. If the notes share an ms value, add it to the list.
-            if note_list.get(f'note{cur_note + 1}') != None and compare_from_range(note_list.get(f'note{cur_note}').ms, note_list.get(f'note{cur_note + 1}').ms, 250) and cur_hit_notes.count(note_list.get(f'note{cur_note + 1}')) == 0:
-                cur_hit_notes.append(note_list.get(f'note{cur_note + 1}'))
+        # add notes that have been read since last frame (if the chart is still being read), and give them to the judge
+        chart_stream.update()
+        if judge.count < len(chart_data):
+            judge.add_chart_notes(chart_data)
         
         # handles (some) user input, also other pygame events
         event_list = pygame.event.get()
@@ -1628,79 +1712,65 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
             if event.type == pygame.KEYDOWN:
                 
                 # receptor inputs
-                for x in range(0, key_count):
-                    # get the hit key and convert it into a string that is it's name
-                    key_pressed = pygame.key.name(event.key).replace("'", '').replace('[', '').replace(']', '')
+                # which lane the key is bound to (see LaneKeys)
+                x = lane_keys.lane(event)
+                if x != None and not paused:
                     
-                    # compare key name to the one saved in the keybinds list loaded from config
-                    if key_pressed == keybinds[x] and not paused:
-                        
-                        timer = recep_timers[x]                        
-                        
-                        # change receptor texture
-                        recep = receptors.get(f'receptor{x}')
-                        recep.press(True)
+                    timer = recep_timers[x]                        
+                    
+                    # change receptor texture
+                    recep = receptors.get(f'receptor{x}')
+                    recep.press(True)
+                    
+                    # if you hit a note and you are +/- 250 ms away from the desired hit time, calc note hit logic (the judge decides, see JudgementEngine.press)
+                    if not transition.transitioning and not intro_running and not timer.counting:
+                        judgement = judge.press(x, current_song.conductor.dt * 1000)
                         
-                        # if you hit a note and you are +/- 250 ms away from the desired hit time, calc note hit logic
-                        if not transition.transitioning and not intro_running:
-                            for hit_note in cur_hit_notes:
-                                if not timer.counting:
-                                    if hit_note.ms - current_song.conductor.dt * 1000 < 250 and hit_note.ms - current_song.conductor.dt * 1000 > -133.33 and hit_note.recep_id == x:
-
-                                        # play hitsound
-                                        if p_settings.getboolean('Gameplay', 'hitsounds'):
-                                            pygame.mixer.Sound('sounds/hitsound.wav').play()
+                        if judgement != None:
+                            hit_note = note_list[judgement.index]
 
-                                        # for hold note logic. set note actually_hit flag
-                                        hit_note.actually_hit = True
+                            # play hitsound
+                            if p_settings.getboolean('Gameplay', 'hitsounds'):
+                                SOUNDS.play('hitsound')
 
-                                        # calculate ms accuracy (how far away were you from desired time?) and kill root note
-                                        accuracy_ms = round(hit_note.ms - current_song.conductor.dt * 1000, 2)
-                                        hit_note.kill_root()
+                            # for hold note logic. set note actually_hit flag
+                            hit_note.actually_hit = True
 
-                                        # if note is normal note
-                                        if hit_note.hold_ms <= 0:
+                            # ms accuracy (how far away were you from desired time?) and kill root note
+                            accuracy_ms = round(judgement.offset, 2)
+                            hit_note.kill_root()
 
-                                            # show note hit data (perfect, bad, etc. and ms accurac) and update overall accuracy
-                                            rank_shown, average_acc, rank_text = calc_note_data(accuracy_ms, accuracy_ranks, note_list, rank_text)
+                            # if note is normal note
+                            if judgement.kind == 'hit':
 
-                                            # show rank as a tween
-                                            if rank_tween != None:
-                                                rank_tween.stop()
+                                # show note hit data (perfect, bad, etc. and ms accurac) and update overall accuracy
+                                rank_shown, rank_text = show_judgement(accuracy_ms, judgement.rank)
 
-                                            rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
+                                # show rank as a tween
+                                if rank_tween != None:
+                                    rank_tween.stop()
 
-                                            # timer that removes the rank after a while
-                                            if rank_timer.counting:
-                                                rank_timer.reset(True)
+                                rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
 
-                                            rank_timer.start(0)
+                                # timer that removes the rank after a while
+                                if rank_timer.counting:
+                                    rank_timer.reset(True)
 
-                                            # remove the just hit note from the notes that you can hit
-                                            cur_hit_notes.remove(hit_note)
+                                rank_timer.start(0)
 
-                                        # else if the note is a note with hold length
-                                        else:
-
-                                            # activate note hold mode
-                                            hit_note.holding = True
+                            # else if the note is a note with hold length
+                            else:
 
-                                            # turn on recep timer
-                                            if timer.counting:
-                                                timer.reset(True)
+                                # activate note hold mode (the judge scores it when it is let go)
+                                hit_note.holding = True
 
-                                            timer.start(0)
-                                            timer.count()
+                                # turn on recep timer
+                                if timer.counting:
+                                    timer.reset(True)
 
-                                        # if note is not the last in the list, add the next one to the list of notes that you can hit
-                                        if cur_note + 1 <= len(note_list) - 1:
-                                            cur_note += 1
+                                timer.start(0)
+                                timer.count()
 
-                                    # if you are falling behind, add the next note as a safety net
-                                    elif hit_note.ms - current_song.conductor.dt * 1000 < -133.33:
-                                        if note_list.get(f'note{cur_note + 1}') != None and cur_hit_notes.count(note_list.get(f'note{cur_note + 1}')) == 0:
-                                            cur_hit_notes.append(note_list.get(f'note{cur_note + 1}'))
-                
                 # pause / unpause if the song is playing in the right conditions
                 if event.key == pygame.K_ESCAPE and not intro_running and current_song.conductor.dt > 0 and not transition.transitioning:
                     paused = not paused
@@ -1710,92 +1780,85 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
             if event.type == pygame.KEYUP:
             
                 # receptor inputs
-                for x in range(0, key_count):
+                # which lane the key is bound to (same as KEYDOWN)
+                x = lane_keys.lane(event)
+                if x != None and not paused:
                     
-                    # check keys and stuff (same as KEYDOWN)
-                    key_pressed = pygame.key.name(event.key).replace("'", '').replace('[', '').replace(']', '')
-                    if key_pressed == keybinds[x] and not paused:
-                        
-                        # set hold time based on timer
-                        timer = recep_timers[x]
-                        hold_time = int(timer.dt * 1000)
-                        
-                        recep = receptors.get('receptor{}'.format(x))
-                        
-                        # if the song is playing correctly
-                        if not transition.transitioning and not intro_running:
-
-                            # check hold time of notes that you can hit
-                            for hit_note in cur_hit_notes:
-                                if hit_note != None:
-                                    if hit_note.actually_hit and hit_note.hold_ms > 0 and hit_note.recep_id == x:
-                                         
-                                        # kill hold if you let go early      
-                                        if hold_time < hit_note.hold_ms - 100:
-                                                 
-                                            for hold in hit_note.hold_notes:
-                                                hold.kill()
-                                                
-                                            print('you failed!')
-                                            
-                                            # show miss
-                                            accuracy_ranks[4] += 1
-                                            rank_shown, average_acc, rank_text = calc_note_data(None, accuracy_ranks, note_list, rank_text)
-                                            
-                                            # same as KEYDOWN
-                                            if rank_tween != None:
-                                                rank_tween.stop()
-                                                
-                                            rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
-                                            
-                                            if rank_shown != None:
-                                                rank_shown.alive = False
-                                            
-                                            if rank_timer.counting:
-                                                rank_timer.reset(True)
-                                                    
-                                            rank_timer.start(0)
-                                            
-                                            # print hold time
-                                            print('Receptor', str(recep.id), 'held for', hold_time, 'ms.')
-                                        
-                                        # if you hold the note for the right time
-                                        elif hold_time >= hit_note.hold_ms - 100:
-                                            
-                                            # show accuracy, same as before
-                                            rank_shown, average_acc, rank_text = calc_note_data(accuracy_ms, accuracy_ranks, note_list, rank_text)
-                                            
-                                            if rank_tween != None:
-                                                rank_tween.stop()
-                                            
-                                            rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
-                                            
-                                            if rank_timer.counting:
-                                                rank_timer.reset(True)
-                                                
-                                            rank_timer.start(0)
-                                                
-                                            print('Receptor', str(recep.id), 'held for', hold_time, 'ms.')
-                                        
-                                        # fix bug that leaves behind a hold sprite if you let go before it kills
-                                        for hold in hit_note.hold_notes:
-                                            if hold.alive:
-                                                hold.kill()
-                                        
-                                        # disable holding (you're done now!)
-                                        hit_note.holding = False
+                    # set hold time based on timer
+                    timer = recep_timers[x]
+                    hold_time = int(timer.dt * 1000)
+                    
+                    recep = receptors.get('receptor{}'.format(x))
+                    
+                    # if the song is playing correctly
+                    if not transition.transitioning and not intro_running:
+
+                        # check hold time of the note being held in this lane (if any, see JudgementEngine.release)
+                        judgement = judge.release(x, current_song.conductor.dt * 1000)
+                        if judgement != None:
+                            hit_note = note_list[judgement.index]
+                             
+                            # kill hold if you let go early      
+                            if judgement.rank == MISS:
+                                     
+                                for hold in hit_note.hold_notes:
+                                    hold.kill()
+                                    
+                                print('you failed!')
+                                
+                                # show miss
+                                rank_shown, rank_text = show_judgement(None, MISS)
+                                
+                                # same as KEYDOWN
+                                if rank_tween != None:
+                                    rank_tween.stop()
+                                    
+                                rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
+                                
+                                if rank_shown != None:
+                                    rank_shown.alive = False
+                                
+                                if rank_timer.counting:
+                                    rank_timer.reset(True)
                                         
-                                        # remove note from list
-                                        while cur_hit_notes.count(hit_note) > 0:
-                                            cur_hit_notes.remove(hit_note)
-                        
-                        # un-press receptor
-                        recep.press(False)
-                        
-                        # turn off recep timer
-                        if timer.counting:
-                            timer.reset(True)
-                            timer.dt = 0
+                                rank_timer.start(0)
+                                
+                                # print hold time
+                                print('Receptor', str(recep.id), 'held for', hold_time, 'ms.')
+                            
+                            # if you hold the note for the right time
+                            else:
+                                
+                                # show accuracy, same as before
+                                rank_shown, rank_text = show_judgement(round(judgement.offset, 2), judgement.rank)
+                                
+                                if rank_tween != None:
+                                    rank_tween.stop()
+                                
+                                rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
+                                
+                                if rank_timer.counting:
+                                    rank_timer.reset(True)
+                                    
+                                rank_timer.start(0)
+                                    
+                                print('Receptor', str(recep.id), 'held for', hold_time, 'ms.')
+                            
+                            # fix bug that leaves behind a hold sprite if you let go before it kills
+                            for hold in hit_note.hold_notes:
+                                if hold.alive:
+                                    hold.kill()
+                            
+                            # disable holding (you're done now!)
+                            hit_note.holding = False
+                    
+                    # un-press receptor
+                    recep.press(False)
+                    
+                    # turn off recep timer
+                    if timer.counting:
+                        timer.reset(True)
+                        timer.dt = 0
             
             # handle pause menu
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -1850,78 +1913,91 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
 
                                     transition.play_menu_music = True
  
-        # update screen
-        background.update(DISPLAYSURF)
+        # update screen. the layers are built on the first frame. the settings they use are read when gameplay starts and can't change during a song,
+        # so they are never rebuilt after that (no key needed)
+        # (update both before checking, so the underlay being rebuilt doesn't skip the overlay)
+        layers_changed = underlay.update(None, build_underlay)
+        layers_changed = overlay.update(None, build_overlay) or layers_changed
         
-        # update receptors
+        if layers_changed:
+            renderer.full()
+        
+        underlay.draw(DISPLAYSURF)
+        
+        # update receptors (receptors and notes are batched, then drawn all at once below)
+        # unpressed receptors are already on the underlay, so only pressed ones are drawn (on top of it)
         for x in range(0, key_count):
             recep = receptors.get(f'receptor{x}')
-            recep.update(x, recep_timers[x].dt, receptor_xy, DISPLAYSURF)
+            recep.update(x, recep_timers[x].dt, receptor_xy, sprite_batch, recep.being_pressed)
+            renderer.add_all(recep.drawn_rects)
             
         # update notes
         if current_song.playing:
-            # if playing, check for misses / update note pos
-            for x in range(0, len(note_list)):
-                note = note_list.get(f'note{x}')
+            # if playing, work out where every note is (all at once), make sprites for notes that are coming up, and draw them
+            chart_data.run_calc(current_song.conductor.dt, current_song.sec_per_beat, current_song.beats_shown)
+            note_list.spawn(current_song)
+            
+            for note in note_list.active():
+                if note.alive:
+                    note.update(current_song, sprite_batch)
+                    renderer.add_all(note.drawn_rects)
                 
-                # if the note is actually supposed to be here
-                if note != None:
-                    if note.alive:
-                        note.update(current_song, DISPLAYSURF)
+                # judged and gone, let go of the sprite
+                if not note.alive:
+                    note_list.release(note.index)
+            
+            # check for misses (notes that went past the end of the lane without being hit, see JudgementEngine.advance)
+            for judgement in judge.advance(current_song.conductor.dt * 1000):
+                note = note_list[judgement.index]
+                note.kill_root()
+                
+                # kill hold notes
+                for hold in note.hold_notes:
+                    hold.kill()
+                
+                # display miss (again, exact same as KEYDOWN)
+                rank_shown, rank_text = show_judgement(None, MISS)
+                
+                if rank_tween != None:
+                    rank_tween.stop()
+                    
+                rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
+                
+                if rank_shown != None:
+                    rank_shown.alive = False
+                
+                if rank_timer.counting:
+                    rank_timer.reset(True)
                         
-                        # check for misses. run the note kill check
-                        killed = note.run_kill(current_song)
-                        if killed:
-                            
-                            # kill hold notes
-                            for hold in note.hold_notes:
-                                hold.kill()
-                            
-                            # display miss (again, exact same as KEYDOWN)
-                            accuracy_ranks[4] += 1
-                            rank_shown, average_acc, rank_text = calc_note_data(None, accuracy_ranks, note_list, rank_text)
-                            
-                            if rank_tween != None:
-                                rank_tween.stop()
-                                
-                            rank_tween = tween.to(rank_text, 'scale', 0.7, 0.9, 'easeOutElastic')
-                            
-                            if rank_shown != None:
-                                rank_shown.alive = False
-                            
-                            if rank_timer.counting:
-                                rank_timer.reset(True)
-                                    
-                            rank_timer.start(0)
-                            
-                            # add next note to list
-                            if cur_note + 1 <= len(note_list) - 1:
-                                cur_note += 1
+                rank_timer.start(0)
         
-        # if paused, still draw notes!
+        # if paused, still draw notes! (the pause menu covers the whole screen, so push all of it)
         elif not current_song.playing and paused:
-            for x in range(0, len(note_list)):
-                note = note_list.get(f'note{x}')
-                
-                if note != None:
-                    if note.alive:
-                        note.draw(DISPLAYSURF)
+            renderer.full()
+            
+            for note in note_list.active():
+                if note.alive:
+                    note.draw(sprite_batch)
+        
+        # draw all receptors and notes in one go
+        sprite_batch.flush(DISPLAYSURF)
         
-        # draw HUD assets
+        # draw HUD assets (the boxes and timebar background are all on the overlay)
+        renderer.add_all(overlay.draw(DISPLAYSURF))
         
         # time bar
         if current_song.playing and current_song.conductor.dt >= 0:
             time_prog = current_song.conductor.dt / current_song.length
             
-        pygame.draw.rect(DISPLAYSURF, (0, 0, 0), pygame.Rect(0, 715, 1280, 50)) # timebar background
         pygame.draw.rect(DISPLAYSURF, list(map(int, p_settings.get('Visual', 'timebar colour').split())), pygame.Rect(0, 715, 1280*time_prog, 50)) # timebar
+        renderer.add(pygame.Rect(0, 715, 1280, 50))
 
         # rank display stuff
         if rank_shown != None:
-            rank_shown.draw(DISPLAYSURF)
+            renderer.add(rank_shown.draw(DISPLAYSURF))
             
         if rank_text != None:
-            rank_text.draw(DISPLAYSURF)
+            renderer.add(rank_text.draw(DISPLAYSURF))
             
         if rank_timer.counting:
             rank_timer.count()
@@ -1942,23 +2018,11 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         # now for a bunch of display stuff.
         # basically just grabbing the config bool and drawing the data if the user wants.
         
-        if p_settings.getboolean('Visual', 'show app data'):
-            fps_box.draw(DISPLAYSURF)
-            
-        # always display accuracy
-        acc_box.draw(DISPLAYSURF)
-        
-        if p_settings.getboolean('Debug', 'debug mode'):
-            display_box.draw(DISPLAYSURF)
-        
-        if p_settings.getboolean('Visual', 'extra info'):
-            note_dat_box.draw(DISPLAYSURF)
-        
         if p_settings.getboolean('Visual', 'show app data'):
             fps_display(DISPLAYSURF, global_clock)
         
         # this checks config in the function itself, because it is also used in the chart editor.
-        song_data_display(current_song, accuracy_ranks, average_acc, 'game', DISPLAYSURF)
+        song_data_display(current_song, judge.score.counts, judge.score.accuracy, 'game', DISPLAYSURF)
         
         # update pause menu
         if paused:
@@ -1973,6 +2037,7 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         
         # update transition tween
         if transition.transitioning:
+            renderer.full()
             can_interact = False
             transition.update(DISPLAYSURF)
             transition.image.draw(DISPLAYSURF)
@@ -2031,6 +2096,7 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         
         # run the intro
         if intro_running:
+            renderer.full()
             
             # update intro assets and tween
             for asset in intro_assets:
@@ -2053,6 +2119,7 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
         # when current song is finished
         if current_song.finished and not transition.transitioning:
             print('handling end song')
+            print('Accuracy: {:.2f}%, hit error: {:.2f} ms (+/- {:.2f} ms)'.format(judge.score.accuracy * 100, judge.score.mean_error, judge.score.error_deviation))
             restarted = False
             
             # if in list mode
@@ -2083,7 +2150,7 @@ def gameplay_main(song_to_load, chart_to_load, list_to_load, list_pos, restartin
                 transition.play_menu_music = True
         
         # update display        
-        pygame.display.update()
+        renderer.present()
         
         # update window name with song name and stuff
         pygame.display.set_caption(display_string)
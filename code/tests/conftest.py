@@ -0,0 +1,4 @@
+# the tests import the game's modules the same way the game does (from util.X import ...), so '/code' has to be on the path
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
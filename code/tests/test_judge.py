@@ -0,0 +1,207 @@
+'''*************************************************************************
+Name: Test Judge
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: Tests for the judgement engine and score (util.Judge). No pygame needed, run from the main folder with:
+                     python -m pytest code/tests
+********************************************************************'''
+
+import statistics
+
+from util.Judge import JudgementEngine, ScoreState, calc_accuracy, rank_of, PERFECT, GREAT, GOOD, BAD, MISS
+
+
+# a judge with one note per (ms, lane, hold ms)
+def make_judge(notes, key_count=4, miss_after=200):
+    judge = JudgementEngine(key_count, miss_after)
+    judge.add_notes([float(x[0]) for x in notes], [x[1] for x in notes], [float(x[2]) for x in notes])
+    return judge
+
+
+def test_rank_of():
+    assert rank_of(0) == PERFECT
+    assert rank_of(-50) == PERFECT
+    assert rank_of(75) == GREAT
+    assert rank_of(-110) == GOOD
+    assert rank_of(130) == BAD
+    assert rank_of(200) == BAD
+
+
+def test_hit():
+    judge = make_judge([(1000, 0, 0)])
+
+    judgement = judge.press(0, 1020)
+    assert judgement.kind == 'hit'
+    assert judgement.index == 0
+    assert judgement.lane == 0
+    assert judgement.rank == PERFECT
+    assert judgement.offset == -20
+    assert judge.counts == [1, 0, 0, 0, 0]
+
+    # the note is gone, so it can't be hit again (or missed)
+    assert judge.press(0, 1030) == None
+    assert judge.advance(5000) == []
+
+
+def test_press_with_nothing_to_hit():
+    judge = make_judge([(1000, 0, 0)])
+
+    # wrong lane, and too early
+    assert judge.press(1, 1000) == None
+    assert judge.press(0, 1000 - 250) == None
+    assert judge.counts == [0, 0, 0, 0, 0]
+
+    # still there to be hit
+    assert judge.press(0, 1000 - 249).kind == 'hit'
+
+
+def test_miss():
+    judge = make_judge([(1000, 0, 0), (2000, 1, 0)], miss_after=200)
+
+    assert judge.advance(1200) == []
+
+    missed = judge.advance(1201)
+    assert [(x.kind, x.index, x.rank, x.offset) for x in missed] == [('miss', 0, MISS, None)]
+
+    # only missed once
+    assert judge.advance(1500) == []
+    assert judge.counts == [0, 0, 0, 0, 1]
+
+    # too late to hit, even before it is missed
+    assert judge.press(1, 2000 + 134) == None
+
+
+def test_hold_release():
+    judge = make_judge([(1000, 0, 500)])
+
+    judgement = judge.press(0, 1060)
+    assert judgement.kind == 'hold'
+    assert judgement.rank == GREAT
+
+    # holds aren't scored until they are let go
+    assert judge.counts == [0, 0, 0, 0, 0]
+
+    # held from 1060 until 100 ms (the leniency) before the end is enough
+    judgement = judge.release(0, 1060 + 400)
+    assert judgement.kind == 'release'
+    assert judgement.rank == GREAT
+    assert judgement.offset == -60
+    assert judge.counts == [0, 1, 0, 0, 0]
+
+    # nothing is being held anymore
+    assert judge.release(0, 1600) == None
+
+
+def test_hold_released_early():
+    judge = make_judge([(1000, 0, 500)])
+
+    judge.press(0, 1000)
+    judgement = judge.release(0, 1300)
+    assert judgement.kind == 'release'
+    assert judgement.rank == MISS
+    assert judgement.offset == None
+    assert judge.counts == [0, 0, 0, 0, 1]
+
+
+def test_hold_blocks_lane():
+    judge = make_judge([(1000, 0, 500), (1100, 0, 0)])
+
+    judge.press(0, 1000)
+
+    # the lane is being held, so pressing it again does nothing
+    assert judge.press(0, 1100) == None
+
+
+def test_chord():
+    # notes 0 and 1 are one chord, note 2 is the next
+    judge = make_judge([(0, 0, 0), (100, 1, 0), (400, 2, 0)])
+    assert judge.chords == [0, 0, 1]
+
+    # note 2 can't be hit until note 1 is judged (note 0 is too late to hit, so it doesn't count)
+    assert judge.press(2, 200) == None
+
+    assert judge.press(1, 200).rank == GREAT
+    judgement = judge.press(2, 200)
+    assert judgement.index == 2
+    assert judgement.rank == BAD
+
+
+def test_chord_notes_in_any_order():
+    judge = make_judge([(1000, 0, 0), (1050, 1, 0), (1100, 2, 0)])
+
+    assert judge.press(2, 1050).index == 2
+    assert judge.press(0, 1050).index == 0
+    assert judge.press(1, 1050).index == 1
+
+
+# a note that is too late to hit (but hasn't gone past the end of the lane yet) doesn't stop the next chord from being hit
+def test_late_note_does_not_block_next_chord():
+    judge = JudgementEngine(2, 260)
+    judge.add_notes([0, 300], [0, 1], [0, 0])
+
+    assert judge.advance(250) == []
+
+    judgement = judge.press(1, 250)
+    assert judgement != None
+    assert judgement.kind == 'hit'
+    assert judgement.index == 1
+
+    missed = judge.advance(300)
+    assert [x.index for x in missed] == [0]
+
+
+def test_notes_added_later():
+    judge = make_judge([(1000, 0, 0)])
+    judge.add_notes([2000.0], [1], [0.0])
+    assert judge.count == 2
+
+    # notes added out of order are sorted in with the rest
+    judge.add_notes([500.0], [2], [0.0])
+    assert judge.order == [2, 0, 1]
+    assert judge.press(2, 500).index == 2
+    assert judge.press(0, 1000).index == 0
+
+
+def test_process():
+    judge = make_judge([(1000, 0, 0), (2000, 1, 500), (3000, 2, 0)], miss_after=200)
+    events = [(1010, 0, True), (1050, 0, False), (2000, 1, True), (2450, 1, False), (5000, 3, True)]
+
+    judgements = [(x.kind, x.index, x.rank) for x in judge.process(events)]
+    assert judgements == [('hit', 0, PERFECT), ('hold', 1, PERFECT), ('release', 1, PERFECT), ('miss', 2, MISS)]
+    assert judge.counts == [2, 0, 0, 0, 1]
+    assert judge.accuracy == calc_accuracy(judge.counts, judge.count)
+
+
+def test_score_accuracy():
+    score = ScoreState(10)
+    assert score.accuracy == 0
+
+    counts = [0, 0, 0, 0, 0]
+    for rank in [PERFECT, PERFECT, GREAT, MISS, GOOD, BAD, PERFECT]:
+        score.add(rank, None if rank == MISS else 0)
+        counts[rank] += 1
+
+        assert score.counts == counts
+        assert abs(score.accuracy - calc_accuracy(counts, 10)) < 1e-12
+
+
+def test_score_hit_error():
+    score = ScoreState(10)
+    offsets = [12.5, -30, 4, 48, -7.25]
+    for offset in offsets:
+        score.add(rank_of(offset), offset)
+
+    # misses have no offset, so they don't change the hit error
+    score.add(MISS)
+
+    assert score.hits == len(offsets)
+    assert abs(score.mean_error - statistics.mean(offsets)) < 1e-9
+    assert abs(score.error_variance - statistics.variance(offsets)) < 1e-9
+    assert abs(score.error_deviation - statistics.stdev(offsets)) < 1e-9
+
+
+def test_score_hit_error_with_one_hit():
+    score = ScoreState(1)
+    score.add(PERFECT, 10)
+    assert score.mean_error == 10
+    assert score.error_variance == 0
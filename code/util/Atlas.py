@@ -0,0 +1,153 @@
+'''*************************************************************************
+Name: Atlas
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file contains the texture atlas. All of the small textures in '/assets' are packed into one image,
+                     so the game only has to read one file instead of dozens when it starts.
+                     The pack_rects and build_atlas functions, and the TextureAtlas class are here.
+********************************************************************'''
+
+import os, json
+import pygame
+
+# where the atlas is saved (next to the textures it was made from)
+ATLAS_IMAGE = os.path.join('assets', 'atlas.png')
+ATLAS_INDEX = os.path.join('assets', 'atlas.json')
+
+# textures bigger than this (on either side) are left as loose files. they would waste most of the atlas.
+MAX_TEXTURE_SIZE = 1024
+
+# how wide the atlas can be
+ATLAS_WIDTH = 2048
+
+# space between textures, so smoothscale doesn't bleed one texture into the next
+PADDING = 2
+
+
+## packs rects into rows ("shelves"). the tallest textures go first, and a new shelf is started when a row is full.
+# sizes is a dict of {name: (w, h)}. returns ({name: (x, y, w, h)}, (atlas w, atlas h))
+def pack_rects(sizes, width=ATLAS_WIDTH, padding=PADDING):
+    rects = {}
+    x = 0
+    y = 0
+    shelf_height = 0
+    used_width = 0
+
+    # sort by height (then width, then name so the layout is always the same)
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if w > width:
+            raise ValueError(f'texture {name} is wider than the atlas ({w} > {width})')
+
+        # start a new shelf if this one is full
+        if x + w > width:
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+
+        rects[name] = (x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        used_width = max(used_width, x - padding)
+
+    return rects, (used_width, y + shelf_height)
+
+
+## loads every small png in the folder, packs them into one image, and saves it with a json index of where each texture is.
+# sub folders (like '/assets/logos') are not included. returns the index
+def build_atlas(folder='assets', image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, max_size=MAX_TEXTURE_SIZE):
+    images = {}
+    skipped = []
+
+    for file in sorted(os.listdir(folder)):
+        name, extension = os.path.splitext(file)
+        path = os.path.join(folder, file)
+
+        # only loose pngs (and never the atlas itself)
+        if extension != '.png' or not os.path.isfile(path) or path == image_path:
+            continue
+
+        image = pygame.image.load(path)
+        if image.get_width() > max_size or image.get_height() > max_size:
+            skipped.append(name)
+            continue
+
+        images[name] = image
+
+    rects, size = pack_rects({name: image.get_size() for name, image in images.items()})
+
+    # draw every texture to the atlas
+    atlas = pygame.Surface(size, pygame.SRCALPHA, 32)
+    atlas.fill((0, 0, 0, 0))
+    for name, rect in rects.items():
+        atlas.blit(images[name], rect[:2])
+
+    pygame.image.save(atlas, image_path)
+
+    index = {'size': list(size), 'textures': {name: list(rect) for name, rect in rects.items()}}
+    with open(index_path, 'w') as file:
+        json.dump(index, file, indent=4)
+
+    print(f'packed {len(rects)} textures into {image_path} ({size[0]}x{size[1]}). left out (too big): {skipped}')
+    return index
+
+
+## the TextureAtlas class loads the atlas image once, and hands out pieces of it (subsurfaces) by texture name.
+# if the atlas hasn't been built, it just has no textures, and everything is loaded from the loose files like before.
+# if a loose file was changed after the atlas was built, the loose file is used for that texture instead.
+#   image path (path of the atlas image)
+#   index path (path of the json index)
+#   folder (folder of the loose textures)
+#   image (the atlas surface)
+#   rects (where each texture is in the atlas)
+#   built time (when the atlas was built)
+#   loaded (has the atlas been looked for yet?)
+
+class TextureAtlas():
+
+    def __init__(self, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, folder='assets'):
+        self.image_path = image_path
+        self.index_path = index_path
+        self.folder = folder
+        self.image = None
+        self.rects = {}
+        self.built_time = 0
+        self.loaded = False
+
+    def load(self):
+        # only look for the atlas once (the display has to be setup first, for convert_alpha)
+        self.loaded = True
+
+        if not os.path.isfile(self.image_path) or not os.path.isfile(self.index_path):
+            return False
+
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+
+            self.image = pygame.image.load(self.image_path).convert_alpha()
+            self.rects = {name: pygame.Rect(rect) for name, rect in index['textures'].items()}
+            self.built_time = os.path.getmtime(self.image_path)
+
+        except (OSError, ValueError, KeyError, pygame.error) as error:
+            print(f'could not load texture atlas, using loose textures. ({error})')
+            self.image = None
+            self.rects = {}
+            return False
+
+        return True
+
+    def get(self, texture):
+        # returns the texture's piece of the atlas, or None if the texture isn't in it
+        if not self.loaded:
+            self.load()
+
+        rect = self.rects.get(texture)
+        if rect == None:
+            return None
+
+        # the loose file was edited after the atlas was built (rebuild the atlas!)
+        path = os.path.join(self.folder, texture + '.png')
+        if os.path.isfile(path) and os.path.getmtime(path) > self.built_time:
+            return None
+
+        return self.image.subsurface(rect)
@@ -3,14 +3,15 @@ Name: Chart
 Date: Jan. 20, 2023
 Course: Sun West DLC Computer Science 20
 Program Description: This file contains all of the classes / functions that are related to the chart editor. 
-                     ChartGrid, ChartNote, ChartHoldNote, chart_note_data_display, and save_json are here.
+                     ChartGrid, ChartNote, ChartHoldNote, chart_note_data_display, chart_to_json, write_file_atomic, ChartSaver,
+                     and save_json are here.
 ********************************************************************'''
 
-import configparser, os
+import configparser, os, json, time, threading, queue
 import pygame
 from pygame.locals import *
 
-from util.Classes import Image, Text
+from util.Classes import Image, Text, HUDText, ScaledSurface, TEXTURES
 
 # init fonts
 pygame.font.init()
@@ -74,7 +75,7 @@ class ChartGrid():
         self.pos_in_beats = 0
         
         # debug text setup
-        self.text = Text(str(self.cur_ms), (self.rect.x, self.rect.y), DETAILS_FONT, 0.5, (255, 255, 255))
+        self.text = HUDText(str(int(self.cur_ms)), (self.rect.x, self.rect.y), DETAILS_FONT, 0.45, (255, 255, 255), atlas=True)
         
     def draw(self, surf, text_surf):
         # draw grid rect
@@ -88,7 +89,7 @@ class ChartGrid():
         
         # run draw and update text to current ms
         self.draw(surf, text_surf)
-        self.text = Text(str(int(self.cur_ms)), (self.rect.x, self.rect.y), DETAILS_FONT, 0.45, (255, 255, 255))
+        self.text.set(str(int(self.cur_ms)), pos=(self.rect.x, self.rect.y))
             
         # get mouse pos and set colour
         mpos = pygame.mouse.get_pos()
@@ -152,8 +153,7 @@ class ChartNote():
         
         self.texture = texture
         
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
-        self.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+        self.image = TEXTURES.get(texture, list(map(int, p_settings.get('Visual', 'note colour').split())))
         
         self.type = type
         self.rect = pygame.Rect(self.image.get_rect().x, self.image.get_rect().y, self.image.get_rect().w * scale, self.image.get_rect().h * scale)
@@ -161,6 +161,7 @@ class ChartNote():
         self.start_pos = pygame.math.Vector2()
         self.end_pos = pygame.math.Vector2()
         self.scale = scale
+        self.scaled = ScaledSurface()
         self.alive = True
         self.root_alive = True
         
@@ -176,20 +177,7 @@ class ChartNote():
         self.hold_notes = []
         self.hold_ms_in_steps = int(self.hold_ms / (song.sec_per_step * 1000))
         print(f'Hold MS in steps: {self.hold_ms_in_steps}')
-        if self.hold_ms_in_steps > 0:
-            for x in range(0, self.hold_ms_in_steps + 1):
-            
-                if x == 0:
-                    # hold root
-                    self.hold_notes.append(ChartHoldNote(self, x, 'root', self.ms, receptor_list, recep_id, song))
-                    
-                elif x == self.hold_ms_in_steps:
-                    # end of hold
-                    self.hold_notes.append(ChartHoldNote(self, x, 'end', self.ms + (song.sec_per_step * 1000) * x, receptor_list, recep_id, song))
-                    
-                else:
-                    # middle
-                    self.hold_notes.append(ChartHoldNote(self, x, '', self.ms + (song.sec_per_step * 1000) * x, receptor_list, recep_id, song))
+        self.init_hold(song)
         
         self.beat_to_show = 0
         
@@ -197,6 +185,20 @@ class ChartNote():
         
         self.init_beat_step(song)
         
+    def init_hold(self, song):
+        # one hold body from the note to the end of the hold (or none if there is no hold length)
+        end_ms = self.ms + (song.sec_per_step * 1000) * self.hold_ms_in_steps
+        
+        if self.hold_ms_in_steps <= 0:
+            self.hold_notes = []
+            
+        elif len(self.hold_notes) > 0:
+            # already has a hold, just change its length
+            self.hold_notes[0].set_end(end_ms, song)
+            
+        else:
+            self.hold_notes = [ChartHoldNote(self, self.ms, end_ms, self.receptor_list, self.recep_id, song)]
+        
     def draw(self, surf):
         
         # draw stuff
@@ -205,7 +207,7 @@ class ChartNote():
                 hold.draw(surf)
         
         if self.root_alive:
-            surf.blit(pygame.transform.smoothscale_by(self.image, self.scale), self.pos.xy)
+            surf.blit(self.scaled.get(self.image, self.scale), self.pos.xy)
     
     def update(self, song, cur_ms, note_list, events, hitsounds, surf):
         
@@ -223,15 +225,12 @@ class ChartNote():
                 if event.button == 1:
                     if self.rect.collidepoint(mpos) and self.root_alive:
                         self.selected = True
-                        self.image.fill((0, 0, 0, 0))
-                        self.image = pygame.image.load(os.path.join('assets', self.texture + '_selected' + '.png')).convert_alpha()
-                        self.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+                        self.image = TEXTURES.get(self.texture + '_selected', list(map(int, p_settings.get('Visual', 'note colour').split())))
                         
                     elif not self.rect.collidepoint(mpos):
                         # deselect
                         self.selected = False
-                        self.image = pygame.image.load(os.path.join('assets', self.texture + '.png')).convert_alpha()
-                        self.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+                        self.image = TEXTURES.get(self.texture, list(map(int, p_settings.get('Visual', 'note colour').split())))
                 
                 # if right click and hovering, delete note
                 elif event.button == 3:
@@ -250,21 +249,8 @@ class ChartNote():
                             self.hold_ms_in_steps -= 1
                             self.hold_ms -= song.sec_per_step * 1000
                         
-                        # re init note hold images
-                        self.hold_notes = []
-                        for x in range(0, self.hold_ms_in_steps + 1):
-                        
-                            if x == 0:
-                                # hold root
-                                self.hold_notes.append(ChartHoldNote(self, x, 'root', self.ms, self.receptor_list, self.recep_id, song))
-                                
-                            elif x == self.hold_ms_in_steps:
-                                # end of hold
-                                self.hold_notes.append(ChartHoldNote(self, x, 'end', self.ms + (song.sec_per_step * 1000) * x, self.receptor_list, self.recep_id, song))
-                                
-                            else:
-                                # middle
-                                self.hold_notes.append(ChartHoldNote(self, x, '', self.ms + (song.sec_per_step * 1000) * x, self.receptor_list, self.recep_id, song))
+                        # change the hold length
+                        self.init_hold(song)
                                 
                     elif event.key == pygame.K_e:
                         
@@ -272,29 +258,13 @@ class ChartNote():
                         self.hold_ms_in_steps += 1
                         self.hold_ms += song.sec_per_step * 1000
                         
-                        # re init note hold images
-                        self.hold_notes = []
-                        for x in range(0, self.hold_ms_in_steps + 1):
-                        
-                            if x == 0:
-                                # hold root
-                                self.hold_notes.append(ChartHoldNote(self, x, 'root', self.ms, self.receptor_list, self.recep_id, song))
-                                
-                            elif x == self.hold_ms_in_steps:
-                                # end of hold
-                                self.hold_notes.append(ChartHoldNote(self, x, 'end', self.ms + (song.sec_per_step * 1000) * x, self.receptor_list, self.recep_id, song))
-                                
-                            else:
-                                # middle
-                                self.hold_notes.append(ChartHoldNote(self, x, '', self.ms + (song.sec_per_step * 1000) * x, self.receptor_list, self.recep_id, song))
+                        # change the hold length
+                        self.init_hold(song)
                        
         
-        # update each hold piece
+        # update the hold
         for hold in self.hold_notes:
             hold.update(surf, song)
-            
-        for hold in self.hold_notes:
-            hold.alive = not hold.run_kill(song)
         
         # run calc. if alive, lerp pos
         self.run_calc(song)
@@ -332,85 +302,93 @@ class ChartNote():
 
 
 ## the ChartHoldNote class is the same as the HoldNote class, but changed in the same way that the ChartNote differs from the Note class. Built to work in editor.
+# like HoldNote, it is one object for the whole hold. the part of the hold past the receptors is not drawn.
 
 class ChartHoldNote():
     
-    def __init__(self, parent, id, type, ms, receptor_list, recep_id, song):
-        
-        # init hold image
-        if type == 'root':
-            # hold root
-            self.image = Image('note_hold_root', parent.pos[0], parent.pos[1], 0.5)
-            
-        elif type == 'end':
-            # end of hold
-            self.image = Image('note_hold_end', parent.pos[0], parent.hold_notes[len(parent.hold_notes)-2].image.rect.y - 160, 0.5)
-            
-        else:
-            # middle
-            self.image = Image('note_hold', parent.pos[0], parent.pos[1] - 180 * id, 0.5)
-        
-        # set colour
-        self.image.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+    def __init__(self, parent, ms, end_ms, receptor_list, recep_id, song):
         
         # rotate the image, based on recep id (wacky in chart editor for some reason)
         recep = receptor_list.get(f'receptor{recep_id}')
         self.recep = recep
-        angle = -recep.angle
-        self.image.image = pygame.transform.rotate(self.image.image, angle + 135)
+        angle = -recep.angle + 135
+        
+        # init hold images (set colour and rotate. the sprites are shared, see bake_hold_sprites)
+        colour = list(map(int, p_settings.get('Visual', 'note colour').split()))
+        
+        self.root_image = Image('note_hold_root', parent.pos[0], parent.pos[1], 0.5, colour=colour, angle=angle)
+        self.body_image = Image('note_hold', parent.pos[0], parent.pos[1], 0.5, colour=colour, angle=angle)
+        self.end_image = Image('note_hold_end', parent.pos[0], parent.pos[1], 0.5, colour=colour, angle=angle)
         
         # setup VARS
         self.alive = True
         self.ms = ms
+        self.end_ms = end_ms
         self.recep_id = recep_id
         
         self.calc = None
+        self.end_calc = None
         
-        self.init_beat_step(song)
-        
-        # parent note and hold ID (hold id is used to place images)
+        # parent note
         self.parent = parent
-        self.id = id
+        
+        # how far apart (in calc) the middle sprites are, so they line up end to end
+        self.spacing = TEXTURES.get('note_hold').get_height() * 0.5 / max((self.parent.end_pos - self.parent.start_pos).length(), 1)
+        
+        self.init_beat_step(song)
         
     def kill(self):
         self.alive = False
         
-    # handles killing while playing song
-    def run_kill(self, song):
-        if self.calc > 0.87: 
-            return True
-            
-        elif self.calc < 0.1:
-            return False
-                
-        else:
-            return False
+    def set_end(self, end_ms, song):
+        # change the hold length
+        self.end_ms = end_ms
+        self.init_beat_step(song)
+    
+    def blit(self, image, calc, surf):
+        pos = self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * calc
+        image.xpos = pos.x
+        image.ypos = pos.y
+        return image.draw(surf)
         
     def draw(self, surf):
-        self.image.draw(surf)
+        rects = []
+        if self.calc == None:
+            return rects
+        
+        # nothing is drawn past the receptors
+        head = min(self.calc, 0.87)
+        
+        # hold root
+        if 0 <= self.calc <= 0.87:
+            rects.append(self.blit(self.root_image, self.calc, surf))
+        
+        # middle, tiled from the tail (or the edge of the grid) up to the head
+        calc = max(self.end_calc, 0)
+        while calc < head:
+            rects.append(self.blit(self.body_image, calc, surf))
+            calc += self.spacing
+            
+        # end of hold
+        if 0 <= self.end_calc <= 0.87:
+            rects.append(self.blit(self.end_image, self.end_calc, surf))
+        
+        return rects
         
     def update(self, surf, song):
         
-        # run calc. if alive, lerp
+        # run calc
         self.run_calc(song)
-        if self.calc != None:
-            if self.alive:
-                if 0 <= self.calc <= 1:
-                    self.image.xpos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc)
-                    self.image.ypos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc)
-                
-                # put hold out of frame if not supposed to be drawn
-                else:
-                    self.image.xpos = 1280
-                    self.image.ypos = 720
             
     def run_calc(self, song):
         self.beat_to_show = song.conductor.dt / song.sec_per_beat + song.beats_shown
         self.calc = (0.87 - (self.beat - song.conductor.dt / song.sec_per_beat) / song.beats_shown)
+        self.end_calc = (0.87 - (self.end_beat - song.conductor.dt / song.sec_per_beat) / song.beats_shown)
             
     def init_beat_step(self, song):
         self.beat = self.ms / song.sec_per_beat / 1000
         self.step = self.ms / song.sec_per_step / 1000
+        self.end_beat = self.end_ms / song.sec_per_beat / 1000
         
         
 # display data of currently selected note
@@ -431,66 +409,120 @@ def chart_note_data_display(note, surf):
     tex_string.draw(surf)
 
     
-## save_json() function is used to, well, save chart json file 
-def save_json(note_list, song_data):
+## chart_to_json() makes the text of a chart json in one go.
+# the json is written by hand (not json.dumps) to keep the same layout as charts that are already saved.
+#   notes (list of (recep_id, ms, hold_ms, texture, type) for each note, ms with the offset already added)
+#   offset (the chart offset)
 
-    if len(note_list) > 0:
-        # parse song data from the list of data
-        song = song_data[0]
-        chart_name = song_data[1]
+def chart_to_json(notes, offset):
+
+    # chart JSON format
 
-        # sort the note list by millisecond value (to save it in order)
-        note_list = sorted(note_list, key=lambda c_note: c_note.ms)
+    ## "note{}": [
+    ##  ID,
+    ##  recep_id,
+    ##  ms,
+    ##  hold_ms,
+    ##  texture,
+    ##  type
+    ## ]
+    
+    # sort the notes by millisecond value (to save them in order)
+    notes = sorted(notes, key=lambda note: note[1])
+    
+    # every entry of the json, joined with commas at the end (so there is no ',' after the last one)
+    entries = [f'''
+        "offset": {offset}''']
+    
+    for x, (recep_id, ms, hold_ms, texture, type) in enumerate(notes):
+        entries.append(f'''
+        
+        "note{x}": [
+            {x},
+            {recep_id},
+            {ms},
+            {hold_ms},
+            {json.dumps(str(texture))},
+            {json.dumps(str(type))}
+        ]''')
+    
+    return '{' + ','.join(entries) + '''
+    }'''
 
-        # chart JSON format
 
-        ## "note{}": [
-        ##  ID,
-        ##  recep_id,
-        ##  ms,
-        ##  hold_ms,
-        ##  texture,
-        ##  type
-        ## ]
+## write_file_atomic() saves text to a file without ever leaving a half-written file behind.
+# the text is written to a temporary file next to it, which then replaces the real file in one step. if saving fails, the old file is still there.
+
+def write_file_atomic(path, text):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    
+    os.replace(temp_path, path)
 
-        # open json (if it exists. if it doesn't, python automatically creates that file)
-        chart_json = open(f'songs/{song.name}/{chart_name}.json', 'w')
 
-        # start writing the json stuff
-        chart_json.write('''{''')
-        chart_json.write(f'''
-        "offset": {p_settings.getfloat('Gameplay', 'global offset')},''')
+## the ChartSaver class saves charts on another thread, so saving a big chart doesn't freeze the editor.
+# the notes are copied when save() is run (so the editor can keep changing them), and the thread turns them into json and writes them.
+# it can also autosave every few minutes (autosave() is run every frame, and saves when it is time to).
+#   jobs (charts waiting to be saved)
+#   thread (the saving thread, started on the first save)
+#   last save (time of the last save)
 
-        # write note data for each note
-        for x in range(0, len(note_list)-1):
-            note = note_list[x]
-            chart_json.write(f'''
+class ChartSaver():
+    
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.last_save = time.time()
         
-        "note{x}": [
-            {x},
-            {note.recep_id},
-            {note.ms + p_settings.getfloat('Gameplay', 'global offset')},
-            {note.hold_ms},
-            {'"' + note.texture + '"'},
-            {'"' + str(note.type) + '"'}
-        ],
-        ''')
+    def save(self, note_list, song_data):
+        # parse song data from the list of data
+        song = song_data[0]
+        chart_name = song_data[1]
+        
+        offset = p_settings.getfloat('Gameplay', 'global offset')
+        
+        # copy the note data now (the saving thread never touches the notes themselves)
+        notes = [(note.recep_id, note.ms + offset, note.hold_ms, note.texture, note.type) for note in note_list]
+        
+        if self.thread == None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        
+        self.jobs.put((f'songs/{song.name}/{chart_name}.json', notes, offset))
+        self.last_save = time.time()
+        
+    def run(self):
+        # save charts as they come in
+        while True:
+            path, notes, offset = self.jobs.get()
+            try:
+                write_file_atomic(path, chart_to_json(notes, offset))
+                print(f'saved {path} ({len(notes)} notes)')
+            except OSError as error:
+                print(f'could not save {path}. ({error})')
+            
+            self.jobs.task_done()
+            
+    def autosave(self, note_list, song_data, minutes):
+        # save if it has been long enough since the last save (0 minutes = autosave is off)
+        if minutes > 0 and len(note_list) > 0 and time.time() - self.last_save >= minutes * 60:
+            print('autosaving...')
+            self.save(note_list, song_data)
+            
+    def wait(self):
+        # wait for every save to finish
+        self.jobs.join()
 
-        # format the final note in the correct json formatting (remove ',' after last ']')
-        chart_json.write(f'''
-        
-        "note{len(note_list)-1}": [
-            {len(note_list)-1},
-            {note_list[len(note_list)-1].recep_id},
-            {note_list[len(note_list)-1].ms + p_settings.getfloat('Gameplay', 'global offset')},
-            {note.hold_ms},
-            {'"' + note_list[len(note_list)-1].texture + '"'},
-            {'"' + note_list[len(note_list)-1].type + '"'}
-        ]
-        ''')
 
-        chart_json.write('''
-    }''')
+# the chart saver used by the chart editor
+CHART_SAVER = ChartSaver()
 
-        # save the json file!
-        chart_json.close()
+
+## save_json() function is used to, well, save chart json file (on the saving thread, see ChartSaver)
+def save_json(note_list, song_data):
+
+    if len(note_list) > 0:
+        CHART_SAVER.save(note_list, song_data)
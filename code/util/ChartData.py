@@ -0,0 +1,795 @@
+'''*************************************************************************
+Name: ChartData
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file contains the chart data of a loaded chart, stored as NumPy arrays (one array per note value).
+                     Notes in gameplay are just views of one index of these arrays, so checks over every note can be done all at once.
+                     Charts can also be compiled to a small binary file that loads straight into these arrays (no json parsing).
+                     Loaded charts are cached, so restarting a song doesn't load its chart again.
+                     Chart json can also be read a bit at a time on another thread, so gameplay can start before the whole chart is read.
+                     The ChartData, ChartStream, and ChartCache classes, and the file_hash, source_stamp, compiled_source, restamp_compiled,
+                     compiled_is_current, iter_chart_json, compile_chart, load_compiled, and load_chart functions are here. (no pygame in this file!)
+********************************************************************'''
+
+import os, json, mmap, struct, hashlib, codecs, threading, queue
+from collections import OrderedDict
+import numpy as np
+
+## compiled chart format (all little-endian). the file is saved next to the json, as '<chart name>.chart'
+#   header: magic (4 bytes), version (uint16), note count (uint32), offset (float64), sha256 of the json file (32 bytes),
+#           modified time (int64 ns) and size (uint64) of the json file, string table size (uint32)
+#   string table: json list of [textures, types] (utf-8), padded to 8 bytes
+#   records: one fixed-width NOTE_RECORD per note (ms already has the offset taken away)
+COMPILED_MAGIC = b'PYMC'
+COMPILED_VERSION = 2
+COMPILED_EXTENSION = '.chart'
+COMPILED_HEADER = struct.Struct('<4sHId32sqQI')
+
+# where the json's (modified time, size) are in the header, so they can be updated without compiling again
+SOURCE_STAMP = struct.Struct('<qQ')
+SOURCE_STAMP_POS = struct.calcsize('<4sHId32s')
+
+NOTE_RECORD = np.dtype([('ms', '<f8'), ('hold_ms', '<f8'), ('id', '<i4'), ('texture_id', '<i2'), ('type_id', '<i2'), ('lane', 'i1')], align=True)
+
+## the ChartData class holds every note of a chart in columns. index x of each array is note x (notes are in the order of the chart file).
+#   offset (the chart offset in ms, already taken away from ms)
+#   id (note id)
+#   lane (receptor id of each note)
+#   ms (hit time of each note)
+#   hold ms (hold length of each note)
+#   beat (hit time of each note in beats. set by init_beats())
+#   end beat (time of the end of each note's hold in beats, snapped to steps like the HoldNote. same as beat if there is no hold)
+#   texture id / type id (index of each note's texture / type string in textures / types)
+#   textures / types (every texture / type string used in the chart, each saved once)
+#   alive (is the note still on screen?)
+#   root alive (is the note head still there? false once hit or missed)
+#   holding (is the note being held?)
+#   hit (was the note actually hit?)
+#   calc (the lane position of each note, from the last run_calc(). 0 = spawn, 0.87 = receptor, past 1 = gone)
+#   end calc (the lane position of the end of each note's hold, from the last run_calc())
+#   x / y (screen position of each note, from the last run_calc(). only moved while the note is on the lane (calc 0-1), like always)
+#   lane start / lane end (the spawn and receptor position of each lane, from set_lanes())
+#   sec per beat / sec per step (the song's seconds per beat / step, from init_beats(). used to set the beat of notes added later)
+#   order (note indexes sorted by beat) and sorted beat (the beats in that order), for finding the notes that are on screen
+#   tail / head (the window of notes that are on screen is order[tail:head]. see update_window())
+#   order version (goes up every time the order is sorted again, so anything holding a place in it knows to start over)
+#   mapping (the memory mapped compiled chart that the note arrays are views of, if it was loaded from one)
+
+class ChartData():
+
+    def __init__(self, count=0, offset=0):
+        self.offset = offset
+        self.count = count
+
+        self.id = np.zeros(count, np.int32)
+        self.lane = np.zeros(count, np.int8)
+        self.ms = np.zeros(count, np.float64)
+        self.hold_ms = np.zeros(count, np.float64)
+        self.beat = np.zeros(count, np.float64)
+        self.end_beat = np.zeros(count, np.float64)
+        self.texture_id = np.zeros(count, np.int16)
+        self.type_id = np.zeros(count, np.int16)
+        self.textures = []
+        self.types = []
+
+        self.alive = np.ones(count, np.bool_)
+        self.root_alive = np.ones(count, np.bool_)
+        self.holding = np.zeros(count, np.bool_)
+        self.hit = np.zeros(count, np.bool_)
+
+        self.calc = np.zeros(count, np.float64)
+        self.end_calc = np.zeros(count, np.float64)
+        self.x = np.zeros(count, np.float64)
+        self.y = np.zeros(count, np.float64)
+        
+        # (these are arrays once set, so they are checked with 'is not None'. != None would compare every value)
+        self.lane_start = None
+        self.lane_end = None
+        
+        self.order = np.arange(count)
+        self.sorted_beat = self.beat
+        self.tail = 0
+        self.head = 0
+        self.order_version = 0
+        
+        self.sec_per_beat = None
+        self.sec_per_step = None
+        self.mapping = None
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def from_records(cls, records, offset, textures, types):
+        # make chart data out of NOTE_RECORD records. the note value arrays are views of the records (no copying!)
+        chart = cls(len(records), offset)
+        chart.id = records['id']
+        chart.lane = records['lane']
+        chart.ms = records['ms']
+        chart.hold_ms = records['hold_ms']
+        chart.texture_id = records['texture_id']
+        chart.type_id = records['type_id']
+        chart.textures = textures
+        chart.types = types
+        
+        return chart
+
+    def fresh(self):
+        # a copy of the chart where every note is unplayed. the note values never change, so they are shared, not copied
+        chart = ChartData(0, self.offset)
+        chart.count = self.count
+        chart.id = self.id
+        chart.lane = self.lane
+        chart.ms = self.ms
+        chart.hold_ms = self.hold_ms
+        chart.beat = self.beat
+        chart.end_beat = self.end_beat
+        chart.texture_id = self.texture_id
+        chart.type_id = self.type_id
+        chart.textures = self.textures
+        chart.types = self.types
+        chart.sec_per_beat = self.sec_per_beat
+        chart.sec_per_step = self.sec_per_step
+        chart.mapping = self.mapping
+        chart.order = self.order
+        chart.sorted_beat = self.sorted_beat
+        chart.order_version = self.order_version
+        
+        chart.alive = np.ones(self.count, np.bool_)
+        chart.root_alive = np.ones(self.count, np.bool_)
+        chart.holding = np.zeros(self.count, np.bool_)
+        chart.hit = np.zeros(self.count, np.bool_)
+        chart.calc = np.zeros(self.count, np.float64)
+        chart.end_calc = np.zeros(self.count, np.float64)
+        
+        if self.lane_start is not None:
+            chart.set_lanes(self.lane_start, self.lane_end)
+        else:
+            chart.x = np.zeros(self.count, np.float64)
+            chart.y = np.zeros(self.count, np.float64)
+        
+        return chart
+
+    def to_records(self):
+        records = np.zeros(self.count, NOTE_RECORD)
+        records['id'] = self.id
+        records['lane'] = self.lane
+        records['ms'] = self.ms
+        records['hold_ms'] = self.hold_ms
+        records['texture_id'] = self.texture_id
+        records['type_id'] = self.type_id
+        
+        return records
+
+    @classmethod
+    def from_json(cls, loaded_JSON):
+        # convert the chart json ({"offset": ms, "note0": [id, lane, ms, hold ms, texture, type], ...}) to columns
+        notes = [loaded_JSON.get(f'note{x}') for x in range(0, len(loaded_JSON)-1)]
+        return cls.from_notes(notes, loaded_JSON['offset'])
+
+    @classmethod
+    def from_notes(cls, notes, offset):
+        # make chart data out of a list of json notes ([id, lane, ms, hold ms, texture, type])
+        chart = cls(0, offset)
+        chart.append(notes)
+        return chart
+
+    def append(self, notes):
+        # add json notes ([id, lane, ms, hold ms, texture, type]) to the end of the chart. the new notes are unplayed
+        count = len(notes)
+        if count == 0:
+            return
+
+        # save each texture / type string once, and give the notes its index
+        texture_id = [self.string_id(self.textures, note[4].replace('"', '')) for note in notes]
+        type_id = [self.string_id(self.types, note[5]) for note in notes]
+
+        ms = np.array([note[2] for note in notes], np.float64) - self.offset
+
+        self.id = np.concatenate((self.id, np.array([note[0] for note in notes], np.int32)))
+        self.lane = np.concatenate((self.lane, np.array([note[1] for note in notes], np.int8)))
+        self.ms = np.concatenate((self.ms, ms))
+        self.hold_ms = np.concatenate((self.hold_ms, np.array([note[3] for note in notes], np.float64)))
+        self.texture_id = np.concatenate((self.texture_id, np.array(texture_id, np.int16)))
+        self.type_id = np.concatenate((self.type_id, np.array(type_id, np.int16)))
+
+        if self.sec_per_beat != None:
+            beat, end_beat = self.calc_beats(ms, self.hold_ms[self.count:])
+        else:
+            beat, end_beat = np.zeros(count, np.float64), np.zeros(count, np.float64)
+        self.beat = np.concatenate((self.beat, beat))
+        self.end_beat = np.concatenate((self.end_beat, end_beat))
+        
+        # new notes start at the spawn of their lane
+        if self.lane_start is not None:
+            lane = self.lane[self.count:]
+            self.x = np.concatenate((self.x, self.lane_start[lane, 0]))
+            self.y = np.concatenate((self.y, self.lane_start[lane, 1]))
+        else:
+            self.x = np.concatenate((self.x, np.zeros(count, np.float64)))
+            self.y = np.concatenate((self.y, np.zeros(count, np.float64)))
+
+        self.alive = np.concatenate((self.alive, np.ones(count, np.bool_)))
+        self.root_alive = np.concatenate((self.root_alive, np.ones(count, np.bool_)))
+        self.holding = np.concatenate((self.holding, np.zeros(count, np.bool_)))
+        self.hit = np.concatenate((self.hit, np.zeros(count, np.bool_)))
+        self.calc = np.concatenate((self.calc, np.zeros(count, np.float64)))
+        self.end_calc = np.concatenate((self.end_calc, np.zeros(count, np.float64)))
+
+        # only counted once every array has them
+        self.count += count
+        
+        # charts are (almost always) in order, so the new notes can usually just go on the end of the order
+        if self.sec_per_beat != None:
+            new_order = np.argsort(beat, kind='stable')
+            if len(self.sorted_beat) == 0 or beat[new_order[0]] >= self.sorted_beat[-1]:
+                self.order = np.concatenate((self.order, new_order + (self.count - count)))
+                self.sorted_beat = np.concatenate((self.sorted_beat, beat[new_order]))
+            else:
+                self.sort_notes()
+
+    def string_id(self, strings, string):
+        if string not in strings:
+            strings.append(string)
+        return strings.index(string)
+
+    def init_beats(self, sec_per_beat, sec_per_step=None):
+        # hit time (and hold end time) of every note in beats
+        self.sec_per_beat = sec_per_beat
+        self.sec_per_step = sec_per_step
+        self.beat, self.end_beat = self.calc_beats(self.ms, self.hold_ms)
+        self.sort_notes()
+
+    def sort_notes(self):
+        # sort the note indexes by beat (notes at the same time stay in chart order), and start the window over
+        self.order = np.argsort(self.beat, kind='stable')
+        self.sorted_beat = self.beat[self.order]
+        self.tail = 0
+        self.head = 0
+        self.order_version += 1
+
+    def calc_beats(self, ms, hold_ms):
+        # holds are a whole number of steps long (same as HoldNote), and have no length if the step length isn't known
+        beat = ms / self.sec_per_beat / 1000
+        if self.sec_per_step == None:
+            return beat, beat.copy()
+        
+        step_ms = self.sec_per_step * 1000
+        end_ms = ms + np.trunc(hold_ms / step_ms) * step_ms
+        return beat, end_ms / self.sec_per_beat / 1000
+
+    def set_lanes(self, start_positions, end_positions):
+        # the spawn and receptor position of each lane. every note is put back at the spawn of its lane
+        self.lane_start = np.array(start_positions, np.float64)
+        self.lane_end = np.array(end_positions, np.float64)
+        
+        self.x = self.lane_start[self.lane, 0].copy()
+        self.y = self.lane_start[self.lane, 1].copy()
+
+    def lane_length(self, lane):
+        # how long a lane is on screen (in pixels)
+        return float(np.hypot(*(self.lane_end[lane] - self.lane_start[lane])))
+
+    def lerp(self, lane, calc):
+        # screen position(s) on a lane at calc (calc can be an array, then x and y are arrays too)
+        start = self.lane_start[lane]
+        end = self.lane_end[lane]
+        return start[..., 0] + (end[..., 0] - start[..., 0]) * calc, start[..., 1] + (end[..., 1] - start[..., 1]) * calc
+
+    def texture(self, index):
+        return self.textures[self.texture_id[index]]
+
+    def type(self, index):
+        return self.types[self.type_id[index]]
+
+    def validate(self, key_count=8):
+        # returns a list of everything wrong with the chart (empty if nothing is)
+        problems = []
+
+        def add(message, bad):
+            # bad is a bool array of which notes have the problem
+            bad = np.flatnonzero(bad)
+            if len(bad) > 0:
+                ids = ', '.join(str(x) for x in self.id[bad[:5]])
+                problems.append(f'{len(bad)} notes {message} (ids {ids}{", ..." if len(bad) > 5 else ""})')
+
+        add(f'are not in a lane from 0-{key_count-1}', (self.lane < 0) | (self.lane >= key_count))
+        add('have a hit time that is not a number', ~np.isfinite(self.ms))
+        add('have a hold length that is not a number', ~np.isfinite(self.hold_ms))
+        add('have a negative hold length', self.hold_ms < 0)
+        add('are hit before the song starts', self.ms + self.offset < 0)
+
+        unique_ids, counts = np.unique(self.id, return_counts=True)
+        if len(unique_ids) != self.count:
+            problems.append(f'{self.count - len(unique_ids)} note ids are used more than once (ids {", ".join(str(x) for x in unique_ids[counts > 1][:5])})')
+
+        return problems
+
+    def is_sorted(self):
+        # are the notes in hit order?
+        return bool(np.all(np.diff(self.ms) >= 0))
+
+    def sorted(self):
+        # a copy of the chart with the notes in hit order (then lane order, for chords). the original order is kept for ties
+        order = np.lexsort((self.lane, self.ms))
+
+        chart = ChartData.from_records(self.to_records()[order], self.offset, list(self.textures), list(self.types))
+        if self.sec_per_beat != None:
+            chart.init_beats(self.sec_per_beat, self.sec_per_step)
+
+        return chart
+
+    def update_window(self, song_beat, beats_shown):
+        # the head moves up to the last note that has spawned (within beats_shown of the song), found by bisecting the sorted beats.
+        # the tail moves past the notes at the start of the window that are gone (dead notes never come back).
+        # returns the indexes of the notes in the window
+        self.head = int(np.searchsorted(self.sorted_beat, song_beat + beats_shown, 'right'))
+        
+        window = self.order[self.tail:self.head]
+        alive = np.flatnonzero(self.alive[window])
+        if len(alive) > 0:
+            self.tail += int(alive[0])
+        else:
+            self.tail += len(window)
+        
+        return self.order[self.tail:self.head]
+
+    def window(self):
+        # the indexes of the notes in the window (from the last update_window())
+        return self.order[self.tail:self.head]
+
+    def run_calc(self, song_time, sec_per_beat, beats_shown):
+        # lane position of every note (and hold end) in the window at once. the sprites just read these
+        # (notes outside of the window are either not spawned yet or gone, so they are skipped)
+        song_beat = song_time / sec_per_beat
+        window = self.update_window(song_beat, beats_shown)
+        
+        calc = 0.87 - (self.beat[window] - song_beat) / beats_shown
+        self.calc[window] = calc
+        self.end_calc[window] = 0.87 - (self.end_beat[window] - song_beat) / beats_shown
+        
+        # move the notes that are on the lane
+        if self.lane_start is not None:
+            moving = window[(calc >= 0) & (calc <= 1)]
+            self.x[moving], self.y[moving] = self.lerp(self.lane[moving], self.calc[moving])
+
+
+# path of the compiled version of a chart json
+def compiled_path(json_path):
+    return os.path.splitext(json_path)[0] + COMPILED_EXTENSION
+
+
+# sha256 of a file (read a bit at a time)
+def file_hash(path, chunk_size=65536):
+    source_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            source_hash.update(chunk)
+    
+    return source_hash.digest()
+
+
+# the (modified time, size) of a file. if these haven't changed since a chart was compiled, the json doesn't need to be read to know it is the same
+def source_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# the (sha256, (modified time, size)) of the json a compiled chart was made from (from its header), or None if it isn't a compiled chart
+def compiled_source(chart_path):
+    try:
+        with open(chart_path, 'rb') as file:
+            magic, version, count, offset, source_hash, mtime, size, strings_size = COMPILED_HEADER.unpack(file.read(COMPILED_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        return None
+    return source_hash, (mtime, size)
+
+
+# save a new (modified time, size) of the json in a compiled chart (the json was touched, but its contents are the same)
+def restamp_compiled(chart_path, stamp):
+    try:
+        with open(chart_path, 'r+b') as file:
+            file.seek(SOURCE_STAMP_POS)
+            file.write(SOURCE_STAMP.pack(*stamp))
+    except OSError as error:
+        print(f'could not update compiled chart {chart_path}. ({error})')
+
+
+## compiled_is_current() checks if there is a compiled chart that was made from the json as it is now.
+# if the json has the same modified time and size as when it was compiled, it is (without reading the json at all).
+# if not, the json is hashed and checked against the sha256 saved in the compiled chart, so a json that was restored or copied
+# (with a different modified time) is only compiled again if its contents changed. if they didn't, the new modified time is saved, so it isn't hashed next time.
+#   json path (path of the chart json)
+#   chart path (path of the compiled chart)
+#   compiled (the compiled chart's (sha256, (modified time, size)), if they have already been read)
+#   source hash (the sha256 of the json, if it has already been worked out)
+
+def compiled_is_current(json_path, chart_path, compiled=None, source_hash=None):
+    if compiled == None:
+        compiled = compiled_source(chart_path)
+        if compiled == None:
+            return False
+    
+    compiled_hash, compiled_stamp = compiled
+    stamp = source_stamp(json_path)
+    if compiled_stamp == stamp:
+        return True
+    
+    if source_hash == None:
+        source_hash = file_hash(json_path)
+    if compiled_hash != source_hash:
+        return False
+    
+    restamp_compiled(chart_path, stamp)
+    return True
+
+
+## iter_chart_json() reads a chart json file a bit at a time, and gives back each (key, value) of the chart as soon as it is read
+# (so "offset" first, then each note, in the order they are in the file). the whole file is never in memory at once.
+#   file (the chart file, opened in binary mode)
+#   source hash (a hashlib hash to update with every byte read, if any)
+#   chunk size (how many bytes to read at a time)
+
+def iter_chart_json(file, source_hash=None, chunk_size=65536):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    end_of_file = False
+    
+    # what comes next: '{', a key (or '}'), ':', or a value
+    expecting = 'start'
+    key = None
+    
+    def read_chunk():
+        nonlocal buffer, pos, end_of_file
+        chunk = file.read(chunk_size)
+        if source_hash != None:
+            source_hash.update(chunk)
+        
+        # throw away what has already been read
+        end_of_file = len(chunk) == 0
+        buffer = buffer[pos:] + text_decoder.decode(chunk, end_of_file)
+        pos = 0
+    
+    while True:
+        # skip spaces / new lines
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        
+        if pos >= len(buffer):
+            if end_of_file:
+                raise ValueError('chart json ended early')
+            read_chunk()
+            continue
+        
+        char = buffer[pos]
+        
+        if expecting == 'start':
+            if char != '{':
+                raise ValueError('chart json has to start with {')
+            pos += 1
+            expecting = 'key'
+        
+        elif expecting == 'key' and char == '}':
+            return
+        
+        elif expecting == 'key' and char == ',':
+            pos += 1
+        
+        elif expecting == 'colon':
+            if char != ':':
+                raise ValueError(f'chart json is missing a : after "{key}"')
+            pos += 1
+            expecting = 'value'
+        
+        else:
+            # a key or a value
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                if end_of_file:
+                    raise ValueError(f'chart json could not be read after "{key}" ({error})')
+                item, end = None, None
+            
+            # cut off by the end of the buffer. read more and try again
+            # (numbers can look finished when they aren't, like 12.5 cut off to 12. so the value has to be followed by something that ends it)
+            if end == None or (not end_of_file and (end >= len(buffer) or buffer[end] not in ' \t\r\n,:}]')):
+                read_chunk()
+                continue
+            
+            pos = end
+            if expecting == 'key':
+                key = item
+                expecting = 'colon'
+            else:
+                expecting = 'key'
+                yield key, item
+
+
+## compile_chart() saves chart data to a compiled chart file.
+#   chart (the ChartData to save)
+#   path (where to save it)
+#   source hash (sha256 of the json it was made from)
+#   stamp ((modified time, size) of the json it was made from, see source_stamp)
+
+def compile_chart(chart, path, source_hash, stamp=(0, 0)):
+    strings = json.dumps([chart.textures, chart.types]).encode('utf-8')
+    strings += b'\0' * (-(COMPILED_HEADER.size + len(strings)) % 8)
+    
+    # write to a temporary file first, so a half-written chart is never loaded
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, chart.count, chart.offset, source_hash, stamp[0], stamp[1], len(strings)))
+        file.write(strings)
+        file.write(chart.to_records().tobytes())
+        
+    os.replace(temp_path, path)
+
+
+## load_compiled() loads a compiled chart. the file is memory mapped and the note arrays are views straight into it.
+# returns (ChartData, (sha256, (modified time, size)) of the json it was made from). raises ValueError if the file isn't a compiled chart.
+
+def load_compiled(path):
+    with open(path, 'rb') as file:
+        # empty files can't be mapped
+        if os.fstat(file.fileno()).st_size < COMPILED_HEADER.size:
+            raise ValueError(f'{path} is too small to be a compiled chart')
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    magic, version, count, offset, source_hash, mtime, size, strings_size = COMPILED_HEADER.unpack_from(mapping, 0)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        raise ValueError(f'{path} is not a version {COMPILED_VERSION} compiled chart')
+    
+    start = COMPILED_HEADER.size + strings_size
+    if len(mapping) < start + count * NOTE_RECORD.itemsize:
+        raise ValueError(f'{path} is cut off')
+    
+    textures, types = json.loads(mapping[COMPILED_HEADER.size:start].rstrip(b'\0').decode('utf-8'))
+    records = np.frombuffer(mapping, NOTE_RECORD, count, start)
+    
+    chart = ChartData.from_records(records, offset, textures, types)
+    
+    # keep the mapping open for as long as the chart is used
+    chart.mapping = mapping
+    
+    return chart, (source_hash, (mtime, size))
+
+
+## load_chart() loads a chart json. if it has been compiled (and the compiled chart was made from this exact json, see compiled_is_current), that is loaded instead.
+# if not, the json is parsed and then compiled, so it loads quicker next time.
+#   json path (path of the chart json)
+#   chart path (path of the compiled chart. next to the json if not given)
+#   source hash (the sha256 of the json, if it has already been worked out)
+
+def load_chart(json_path, chart_path=None, source_hash=None):
+    if chart_path == None:
+        chart_path = compiled_path(json_path)
+    
+    if os.path.exists(chart_path):
+        try:
+            chart, compiled = load_compiled(chart_path)
+            if compiled_is_current(json_path, chart_path, compiled, source_hash):
+                return chart
+            
+            print(f'compiled chart {chart_path} is out of date, compiling it again.')
+        
+        except (OSError, ValueError, struct.error) as error:
+            print(f'could not load compiled chart {chart_path}, loading json instead. ({error})')
+    
+    stamp = source_stamp(json_path)
+    with open(json_path, 'rb') as file:
+        source = file.read()
+        
+    chart = ChartData.from_json(json.loads(source))
+    
+    try:
+        compile_chart(chart, chart_path, hashlib.sha256(source).digest(), stamp)
+    except OSError as error:
+        print(f'could not compile chart {json_path}. ({error})')
+    
+    return chart
+
+
+## the ChartStream class reads a chart json on another thread (with iter_chart_json), and hands the notes over in batches as they are read.
+# chart is usable right away. update() (run on the main thread, every frame) adds the notes that have been read since the last update.
+# once the whole file is read, the chart is compiled so it doesn't need to be read again.
+#   json path (path of the chart json)
+#   chart path (where to save the compiled chart)
+#   on done (function run with the finished ChartData once the whole chart is read, if any. used by the ChartCache)
+#   batch size (how many notes are handed over at once)
+#   chart (the chart, with every note read so far)
+#   batches (notes read by the thread, waiting to be added to the chart)
+#   finished (has the whole chart been read?)
+#   error (the error that stopped the chart from being read, if any. wait() raises it again on the main thread (at load, like loading the chart right away would).
+#          update() runs during gameplay, so it only prints it (once) and the song carries on with the notes that were read)
+
+class ChartStream():
+
+    def __init__(self, json_path, chart_path, on_done=None, batch_size=256):
+        self.json_path = json_path
+        self.chart_path = chart_path
+        self.on_done = on_done
+        self.batch_size = batch_size
+        
+        self.chart = ChartData()
+        self.batches = queue.Queue()
+        self.finished = False
+        self.error = None
+        
+        self.thread = threading.Thread(target=self.read, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_chart(cls, chart):
+        # a stream that is already finished (the chart was cached / compiled)
+        stream = cls.__new__(cls)
+        stream.json_path = None
+        stream.chart_path = None
+        stream.on_done = None
+        stream.batch_size = 0
+        stream.chart = chart
+        stream.batches = queue.Queue()
+        stream.finished = True
+        stream.error = None
+        stream.thread = None
+        
+        return stream
+
+    def read(self):
+        # runs on the thread. nothing here touches self.chart (the main thread is using it), it only puts batches in the queue
+        try:
+            stamp = source_stamp(self.json_path)
+            source_hash = hashlib.sha256()
+            offset = None
+            notes = []
+            batch = []
+            
+            with open(self.json_path, 'rb') as file:
+                for key, value in iter_chart_json(file, source_hash):
+                    if key == 'offset':
+                        offset = value
+                        self.batches.put(('offset', value))
+                        
+                    elif key.startswith('note'):
+                        notes.append(value)
+                        batch.append(value)
+                        
+                        # notes need the offset first (it is always the first thing in the chart)
+                        if len(batch) >= self.batch_size and offset != None:
+                            self.batches.put(('notes', batch))
+                            batch = []
+            
+            if offset == None:
+                offset = 0
+                self.batches.put(('offset', offset))
+            self.batches.put(('notes', batch))
+            
+            # the full chart, for the cache, and to compile it
+            full_chart = ChartData.from_notes(notes, offset)
+            try:
+                compile_chart(full_chart, self.chart_path, source_hash.digest(), stamp)
+            except OSError as error:
+                print(f'could not compile chart {self.json_path}. ({error})')
+                
+            self.batches.put(('done', full_chart))
+            
+        # anything that goes wrong has to be handed over, or the main thread would wait for the rest of the chart forever
+        except Exception as error:
+            self.batches.put(('error', error))
+
+    def update(self):
+        # runs on the main thread. add the notes that have been read so far. returns the chart
+        while not self.finished:
+            try:
+                kind, value = self.batches.get_nowait()
+            except queue.Empty:
+                break
+            
+            self.handle(kind, value)
+        
+        return self.chart
+
+    def wait(self, note_count=None):
+        # wait until the whole chart is read (or until it has at least note_count notes). returns the chart
+        while not self.finished and (note_count == None or len(self.chart) < note_count):
+            kind, value = self.batches.get()
+            self.handle(kind, value)
+        
+        if self.error != None:
+            raise self.error
+        
+        return self.chart
+
+    def handle(self, kind, value):
+        if kind == 'offset':
+            self.chart.offset = value
+            
+        elif kind == 'notes':
+            self.chart.append(value)
+            
+        elif kind == 'done':
+            self.finished = True
+            if self.on_done != None:
+                self.on_done(value)
+                
+        elif kind == 'error':
+            self.finished = True
+            self.error = value
+            print(f'could not read chart {self.json_path}. ({value})')
+
+
+## the ChartCache class keeps charts that have already been loaded, so restarting a song (or playing it again) doesn't load the chart again.
+# charts are saved by (path, modified time, size) of the json, so an edited chart is loaded again.
+# every load gives a fresh copy of the chart (every note unplayed), that shares the note values with the cached one.
+#   cache folder (folder to save compiled charts in. if empty, they are saved next to the json)
+#   max charts (how many charts to keep at once. the least recently used ones are dropped)
+#   charts (the cached charts, in least -> most recently used order)
+
+class ChartCache():
+
+    def __init__(self, cache_folder='', max_charts=8):
+        self.cache_folder = cache_folder
+        self.max_charts = max_charts
+        self.charts = OrderedDict()
+
+    def compiled_path(self, json_path):
+        # compiled charts go in the cache folder if there is one (named by path, so charts with the same name don't clash)
+        if self.cache_folder == '':
+            return compiled_path(json_path)
+        
+        os.makedirs(self.cache_folder, exist_ok=True)
+        name = hashlib.sha1(os.path.abspath(json_path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_folder, name + '_' + os.path.splitext(os.path.basename(json_path))[0] + COMPILED_EXTENSION)
+
+    def key(self, json_path):
+        stat = os.stat(json_path)
+        return (os.path.abspath(json_path), stat.st_mtime_ns, stat.st_size)
+
+    def add(self, key, chart):
+        self.charts[key] = chart
+        
+        # drop the least recently used charts
+        while len(self.charts) > self.max_charts:
+            self.charts.popitem(last=False)
+
+    def get(self, key):
+        # already loaded?
+        chart = self.charts.get(key)
+        if chart != None:
+            self.charts.move_to_end(key)
+        
+        return chart
+
+    def load(self, json_path):
+        # load the whole chart right away
+        key = self.key(json_path)
+        
+        chart = self.get(key)
+        if chart == None:
+            chart = load_chart(json_path, self.compiled_path(json_path))
+            self.add(key, chart)
+        
+        return chart.fresh()
+
+    def stream(self, json_path):
+        # load a chart as a ChartStream. cached and compiled charts are loaded right away (the stream is already finished),
+        # and json charts are read on another thread, then cached once they are done
+        key = self.key(json_path)
+        chart_path = self.compiled_path(json_path)
+        
+        # (if the json only has a new modified time, compiled_is_current hashes it once and saves the new time, so load() doesn't hash it again)
+        if self.get(key) == None and not compiled_is_current(json_path, chart_path):
+            return ChartStream(json_path, chart_path, lambda chart: self.add(key, chart))
+        
+        return ChartStream.from_chart(self.load(json_path))
+
+    def clear(self):
+        self.charts.clear()
+
+
+# the chart cache the whole game loads charts through
+CHARTS = ChartCache()
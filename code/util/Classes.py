@@ -3,28 +3,186 @@ Name: Classes
 Date: Jan. 20, 2023
 Course: Sun West DLC Computer Science 20
 Program Description: This file houses all of the utility Python classes that are reused throughout the project. 
-                     Image, Text, Timer, Button, and TextInput classes are housed here.
+                     TextureCache, ScaledSurface, Image, Text, GlyphAtlas, HUDText, Timer, LaneKeys, Button, and TextInput classes are housed here.
 ********************************************************************'''
 
 import time, os, configparser
+from collections import OrderedDict
 import tween
 import pygame
 from pygame.locals import *
 
+from util.Sound import SOUNDS
+from util.Atlas import TextureAtlas
+
 # setup the config parser. It loads the player_settings.ini file in '/config' and loads, as it says, settings.
 p_settings = configparser.RawConfigParser()
 p_settings.read_file(open('config/player_settings.ini'))
 
+## the TextureCache class is a process-wide registry of every texture loaded from '/assets'.
+# each png is decoded from disk once (or cut out of the texture atlas, if it has been built), and every Image, Note, Receptor, etc. that asks for it gets the same surface back.
+# tinted textures (note colour, bg colour) are copied from the plain texture once per colour and shared the same way.
+# rotated textures (hold notes) are made from the tinted one once per angle, so every hold segment in a lane shares one surface.
+# smoothscaled copies of surfaces are kept here too (see scaled()), once per surface and scale.
+# surfaces handed out are SHARED. if you want to draw on one / fill it, copy it first!
+#   atlas (the texture atlas. textures that aren't in it are loaded from their own file)
+#   textures (the loaded surfaces, in least -> most recently used order. scaled copies are saved by (surface, scale))
+#   budget (how many bytes of surfaces can be kept before the least recently used ones are dropped)
+#   bytes used (how many bytes the cached surfaces currently take up)
+#   hits (how many times a texture was already loaded)
+#   misses (how many times a texture had to be loaded / tinted)
+
+class TextureCache():
+    
+    def __init__(self, budget, atlas=None):
+        self.atlas = atlas
+        self.textures = OrderedDict()
+        self.budget = budget
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        
+    def get(self, texture, colour=None, angle=None):
+        # textures are saved by name, tint colour, and rotation angle
+        if colour != None:
+            colour = tuple(colour)
+        key = (texture, colour, angle)
+        
+        # already loaded? move it to the "recently used" end and return it
+        surface = self.textures.get(key)
+        if surface != None:
+            self.textures.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        
+        if angle != None:
+            # rotate the tinted texture
+            surface = pygame.transform.rotate(self.get(texture, colour), angle)
+        
+        elif colour == None:
+            # cut the texture out of the atlas, or load it from disk if it isn't there
+            surface = None
+            if self.atlas != None:
+                surface = self.atlas.get(texture)
+            
+            if surface == None:
+                surface = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
+        else:
+            # copy the plain texture and tint the copy (the plain one stays shared)
+            surface = self.get(texture).copy()
+            surface.fill(colour, special_flags=pygame.BLEND_MULT)
+        
+        self.add(key, surface)
+        return surface
+    
+    def add(self, key, surface):
+        # save surface and drop the least recently used ones if over budget (never drop the one just added)
+        self.textures[key] = surface
+        self.bytes_used += self.size_of(surface)
+        
+        while self.bytes_used > self.budget and len(self.textures) > 1:
+            old_key, old_surface = self.textures.popitem(last=False)
+            self.bytes_used -= self.size_of(old_surface)
+    
+    def scaled(self, surface, scale):
+        # the smoothscaled copy of a surface, made once per (surface, scale) and shared by everything that draws it at that scale
+        key = (surface, scale)
+        scaled = self.textures.get(key)
+        if scaled != None:
+            self.textures.move_to_end(key)
+            self.hits += 1
+            return scaled
+        
+        self.misses += 1
+        scaled = pygame.transform.smoothscale_by(surface, scale)
+        self.add(key, scaled)
+        return scaled
+    
+    def drop_scaled(self, surface):
+        # forget every scaled copy of a surface (if it was drawn on after being scaled)
+        for key in [key for key in self.textures if len(key) == 2 and key[0] is surface]:
+            self.bytes_used -= self.size_of(self.textures.pop(key))
+    
+    def size_of(self, surface):
+        return surface.get_bytesize() * surface.get_width() * surface.get_height()
+        
+    def clear(self):
+        self.textures.clear()
+        self.bytes_used = 0
+        
+    def stats(self):
+        # hit / miss counts and memory usage, for printing
+        return {'hits': self.hits, 'misses': self.misses, 'textures': len(self.textures), 'bytes': self.bytes_used, 'budget': self.budget}
+
+
+# the texture cache that everything shares. 64 MB is way more than all of '/assets' decoded at once.
+TEXTURES = TextureCache(64 * 1024 * 1024, TextureAtlas())
+
+
+## the ScaledSurface class hands out the smoothscaled copy of a surface, so things aren't smoothscaled on every single frame.
+# scaled copies are kept in the TextureCache (see TextureCache.scaled), so every note / receptor / image drawing the same texture at the same scale
+# shares one copy, and a receptor swapping between its normal and "-hit" texture doesn't re-scale either.
+# surfaces that only one object draws (like text, which is rendered for that one Text) can be scaled privately instead (shared=False),
+# so tweening their scale doesn't fill the texture cache with a copy for every frame of the tween.
+# if you fill / draw on a surface after it has been scaled, call invalidate()!
+#   shared (are the scaled copies kept in the texture cache?)
+#   image (the last surface that was scaled)
+#   scale (the scale it was scaled to)
+#   surface (the scaled copy)
+
+class ScaledSurface():
+    
+    def __init__(self, shared=True):
+        self.shared = shared
+        self.image = None
+        self.scale = None
+        self.surface = None
+        
+    def get(self, image, scale):
+        # no need to scale by 1
+        if scale == 1:
+            return image
+        
+        # same as last time, no need to look it up
+        if image is self.image and scale == self.scale:
+            return self.surface
+        
+        if self.shared:
+            surface = TEXTURES.scaled(image, scale)
+        else:
+            surface = pygame.transform.smoothscale_by(image, scale)
+        
+        self.image = image
+        self.scale = scale
+        self.surface = surface
+        return surface
+    
+    def invalidate(self):
+        # the scaled copies of the last surface are out of date (for everything sharing them, too)
+        if self.image != None and self.shared:
+            TEXTURES.drop_scaled(self.image)
+        
+        self.image = None
+        self.scale = None
+        self.surface = None
+
+
 ## the Image class will be used to easily create a surface / graphic
 #   texture (the texture of the image)
 #   x (x pos)
 #   y (y pos)
+#   colour (tint colour of the texture, if any)
+#   angle (rotation of the texture, if any)
+# the image surface comes from the TextureCache and is shared. copy it before filling it!
 
 class Image():
     
-    def __init__(self, texture, x, y, scale, align='topleft'):
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
+    def __init__(self, texture, x, y, scale, align='topleft', colour=None, angle=None):
+        self.image = TEXTURES.get(texture, colour, angle)
         self.scale = scale
+        self.scaled = ScaledSurface()
         
         image_rect = self.image.get_rect()
         image_rect.x = x
@@ -41,7 +199,7 @@ class Image():
         setattr(self.image.get_rect(), align, self.pos)
         
     def draw(self, surf):
-        surf.blit(pygame.transform.smoothscale_by(self.image, self.scale), (self.xpos, self.ypos))
+        return surf.blit(self.scaled.get(self.image, self.scale), (self.xpos, self.ypos))
         
         
 ## the Text class will be used to optimize performance (just displaying the fps as text made the fps drop - ironic, isn't it?))
@@ -61,6 +219,7 @@ class Text():
         self.image = font.render(text, antialias, colour)
         self.rect = self.image.get_rect()
         self.scale = scale
+        self.scaled = ScaledSurface(False)
         # set align
         setattr(self.rect, align, pos)
         
@@ -68,7 +227,182 @@ class Text():
         
     def draw(self, surf):
         if self.alive:
-            surf.blit(pygame.transform.smoothscale_by(self.image, self.scale), self.rect)       
+            return surf.blit(self.scaled.get(self.image, self.scale), self.rect)       
+
+
+## the GlyphAtlas class renders each character of a font once (in one colour and scale) onto a single surface.
+# strings are then drawn by blitting each character's piece of that surface with Surface.blits, no font.render needed.
+# this is for HUD numbers that change every frame (fps, ms offset, accuracy, beat / step / ms).
+# characters that weren't rendered yet are added to the atlas the first time they are used.
+#   font (font to render with)
+#   colour (text colour)
+#   scale (glyphs are smoothscaled once when the atlas is built, instead of every frame)
+#   antialias (is text anti-aliased?)
+#   image (the atlas surface that holds every character)
+#   areas (the rect of each character on the atlas surface)
+#   widths (the unscaled width of each character, used for alignment the same way as Text)
+#   height (unscaled height of a line of text)
+
+class GlyphAtlas():
+    
+    # every atlas made so far, saved by font, colour, scale and antialias (see GlyphAtlas.get())
+    atlases = {}
+    
+    def __init__(self, font, colour, scale=1, antialias=True, chars='0123456789.,:%-+ '):
+        self.font = font
+        self.colour = tuple(colour)
+        self.scale = scale
+        self.antialias = antialias
+        
+        self.image = None
+        self.areas = {}
+        self.widths = {}
+        self.height = self.font.get_height()
+        
+        self.build(chars)
+        
+    @classmethod
+    def get(cls, font, colour, scale=1, antialias=True):
+        # reuse an atlas if one was already made with the same settings
+        key = (font, tuple(colour), scale, antialias)
+        atlas = cls.atlases.get(key)
+        
+        if atlas == None:
+            atlas = cls(font, colour, scale, antialias)
+            cls.atlases[key] = atlas
+            
+        return atlas
+        
+    def build(self, chars):
+        # render and scale every character
+        glyphs = []
+        for char in chars:
+            glyph = self.font.render(char, self.antialias, self.colour)
+            self.widths[char] = glyph.get_width()
+            
+            if self.scale != 1:
+                glyph = pygame.transform.smoothscale_by(glyph, self.scale)
+            glyphs.append(glyph)
+        
+        # put them all side by side on one surface (RGBA_MAX copies the pixels instead of blending them with the empty surface)
+        width = max(1, sum([glyph.get_width() for glyph in glyphs]))
+        height = max([1] + [glyph.get_height() for glyph in glyphs])
+        self.image = pygame.Surface((width, height), pygame.SRCALPHA)
+        
+        self.areas = {}
+        x = 0
+        for char, glyph in zip(chars, glyphs):
+            self.image.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.areas[char] = pygame.Rect(x, 0, glyph.get_width(), glyph.get_height())
+            x += glyph.get_width()
+            
+    def add_missing(self, text):
+        # rebuild with any new characters added on
+        missing = ''.join(sorted(set(text) - set(self.areas)))
+        if missing != '':
+            self.build(''.join(self.areas) + missing)
+        
+    def size(self, text):
+        # unscaled size of the text (same as font.size)
+        self.add_missing(text)
+        return (sum([self.widths[char] for char in text]), self.height)
+        
+    def draw(self, surf, text, pos):
+        self.add_missing(text)
+        
+        # grab each character's area on the atlas and blit them all in one go
+        x, y = pos
+        blits = []
+        for char in text:
+            area = self.areas[char]
+            blits.append((self.image, (x, y), area))
+            x += area.w
+            
+        surf.blits(blits, doreturn=False)
+        
+        # return the rect that was drawn to (like surf.blit does)
+        return pygame.Rect(pos[0], pos[1], x - pos[0], self.image.get_height())
+
+
+## the HUDText class is a Text that is kept around between frames, for HUD values that are drawn every frame (fps, accuracy, etc.)
+# instead of making a new Text (and a new font.render) every frame, call set() with the new string. it only re-renders if the string or colour changed.
+# if atlas is True, the text is drawn from a GlyphAtlas instead of being rendered (good for numbers that change every frame).
+#   string (the last rendered string)
+#   colour (the last rendered colour)
+#   pos (the point the text is aligned to)
+#   renders (total amount of re-renders)
+#   renders per second (how many re-renders happened in the last second. if this is close to the fps, the value changes every frame)
+
+class HUDText(Text):
+    
+    def __init__(self, text, pos, font, scale, colour, align="topleft", antialias=True, atlas=False):
+        super().__init__(text, pos, font, scale, colour, align, antialias)
+        
+        # save everything needed to re-render
+        self.font = font
+        self.align = align
+        self.antialias = antialias
+        self.pos = pos
+        self.string = text
+        self.colour = tuple(colour)
+        
+        # re-render counters
+        self.renders = 0
+        self.renders_per_second = 0
+        self.second_renders = 0
+        self.second_start = time.perf_counter()
+        
+        # glyph atlas to draw from (if using one)
+        self.use_atlas = atlas
+        self.atlas = None
+        if self.use_atlas:
+            self.render()
+        
+    def set(self, text, colour=None, pos=None):
+        if colour == None:
+            colour = self.colour
+        colour = tuple(colour)
+        
+        # move the text (doesn't need a re-render)
+        if pos != None and pos != self.pos:
+            self.pos = pos
+            setattr(self.rect, self.align, pos)
+        
+        # only re-render if something actually changed
+        if text != self.string or colour != self.colour:
+            self.string = text
+            self.colour = colour
+            self.render()
+            
+        # roll over the per-second counter
+        now = time.perf_counter()
+        if now - self.second_start >= 1:
+            self.renders_per_second = self.second_renders
+            self.second_renders = 0
+            self.second_start = now
+            
+    def render(self):
+        if self.use_atlas:
+            # no rendering, just figure out the size of the text from the atlas
+            self.atlas = GlyphAtlas.get(self.font, self.colour, self.scale, self.antialias)
+            self.rect = pygame.Rect((0, 0), self.atlas.size(self.string))
+        else:
+            self.image = self.font.render(self.string, self.antialias, self.colour)
+            self.rect = self.image.get_rect()
+        setattr(self.rect, self.align, self.pos)
+        
+        self.renders += 1
+        self.second_renders += 1
+        
+    def draw(self, surf):
+        if not self.use_atlas:
+            return super().draw(surf)
+            
+        elif self.alive:
+            # grab a new atlas if the scale was changed
+            if self.atlas.scale != self.scale:
+                self.atlas = GlyphAtlas.get(self.font, self.colour, self.scale, self.antialias)
+            return self.atlas.draw(surf, self.string, self.rect.topleft)
        
        
 ## the Timer class will be used to count ms from a certain point
@@ -137,6 +471,57 @@ class Timer():
             self.clock = time.perf_counter()
     
     
+## the LaneKeys class turns a key event into the lane it is bound to, with one dict lookup (no key names or strings made per event).
+# keybinds are key names (from pygame.key.name, like they are saved in '[Gameplay] keybindings'). they are turned into keycodes once, when the scene starts.
+# names that can't be turned into a keycode straight away (keypad keys are saved without their brackets) are learned the first time a key with that name is pressed.
+# scancodes are learned along with keycodes, for keys that come in without a keycode.
+#   names (the lane of each keybind name)
+#   lanes (the lane of each keycode, or None for keys that aren't bound)
+#   scancode lanes (the lane of each scancode that has been pressed)
+
+class LaneKeys():
+    
+    def __init__(self, keybinds):
+        self.names = {}
+        self.lanes = {}
+        self.scancode_lanes = {}
+        
+        for x in range(0, len(keybinds)):
+            # if a key is bound twice, the first lane gets it
+            self.names.setdefault(self.clean_name(keybinds[x]), x)
+            
+        for name, lane in self.names.items():
+            try:
+                self.lanes.setdefault(pygame.key.key_code(name), lane)
+            except ValueError:
+                # learned when it is pressed
+                pass
+                
+    def clean_name(self, name):
+        # the same cleanup that has always been done on key names before comparing them
+        return str(name).replace("'", '').replace('[', '').replace(']', '')
+                
+    def lane(self, event):
+        # returns the lane of a KEYDOWN / KEYUP event, or None if the key isn't bound
+        scancode = getattr(event, 'scancode', None)
+        
+        if event.key in self.lanes:
+            lane = self.lanes[event.key]
+            
+        elif event.key == K_UNKNOWN:
+            return self.scancode_lanes.get(scancode)
+            
+        else:
+            # first time this key is pressed, so learn it by name (only happens once per key)
+            lane = self.names.get(self.clean_name(pygame.key.name(event.key)))
+            self.lanes[event.key] = lane
+        
+        if lane != None and scancode != None and scancode not in self.scancode_lanes:
+            self.scancode_lanes[scancode] = lane
+            
+        return lane
+    
+    
 ## the Button class is used to, be a button. On the title screen, options menu, pause menu, etc.   
 #   rect (button bg, and where click detection is based from)
 #   colour (the button colour)
@@ -175,7 +560,7 @@ class Button():
 
         if self.hovering != self.was_hovering and self.hovering:
             # play hover sound
-            pygame.mixer.Sound('sounds/hover.wav').play()
+            SOUNDS.play('hover')
 
         self.was_hovering = self.hovering
         
@@ -188,7 +573,7 @@ class Button():
                     if event.button == 1:
 
                         # play interacting sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
                         
                         # run function if the button has one.
                         if func != None:
@@ -280,7 +665,7 @@ class TextInput():
                 if event.button == 1:
                     if self.hovering:
                         # play interaction sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
                         self.typing = True
                     else:
                         self.typing = False
@@ -293,7 +678,7 @@ class TextInput():
                     key = pygame.key.name(event.key)
 
                     # play interaction sound
-                    pygame.mixer.Sound('sounds/interact.wav').play()
+                    SOUNDS.play('interact')
                     
                     # get inputted key
                     if key == 'return': 
@@ -364,7 +749,7 @@ class Transition():
 
         # play transitioning sound
         if self.play_transition_sound:
-            pygame.mixer.Sound('sounds/transition.wav').play()
+            SOUNDS.play('transition')
             
     def finish(self):
         
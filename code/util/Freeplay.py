@@ -14,6 +14,7 @@ from pygame.locals import *
 
 from util.Classes import Text, Image
 from util.Util import is_dark
+from util.Sound import SOUNDS
 
 # setup the config parser. It loads the player_settings.ini file in '/config' and loads, as it says, settings.
 p_settings = configparser.RawConfigParser()
@@ -103,7 +104,7 @@ class FreeplaySong():
 
         if self.hovering != self.was_hovering and self.hovering:
             # play hover sound
-            pygame.mixer.Sound('sounds/hover.wav').play()
+            SOUNDS.play('hover')
 
         self.was_hovering = self.hovering
         
@@ -114,7 +115,7 @@ class FreeplaySong():
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1 and self.hovering:
                         # play interacting sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
 
             self.title_text = Text(self.info.title, (self.image.rect.midleft[0] + 5, self.image.rect.topleft[1] + 28), self.font, self.font_size, self.hover_colour, 'midleft')
             self.chart_text = Text(f'- {self.chart_name}', (self.title_text.rect.midright[0] + 5, self.image.rect.midleft[1] - 22), self.font, self.font_size / 1.5, self.hover_colour, 'midleft')
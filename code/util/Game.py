@@ -3,20 +3,22 @@ Name: Game
 Date: Jan. 20, 2023
 Course: Sun West DLC Computer Science 20
 Program Description: This file contains all of the classes / functions that are related to gameplay. 
-                     These include BG, Receptor, Note, HoldNote, Song, 
-                     calc_note_data, play_intro, fps_display, song_data_display, and song_hit_data_display
+                     These include BG, Receptor, Note, NoteList, HoldNote, Song, bake_hold_sprites,
+                     show_judgement, play_intro, fps_display, song_data_display, and song_hit_data_display
 ********************************************************************'''
 
 import os, configparser, operator, math
 import pygame
 from pygame.locals import *
+import numpy as np
 from eyed3 import id3
 from eyed3 import load
 import psutil
 import tween
 
-from util.Util import is_dark, compare_from_range
-from util.Classes import Text, Image, Timer
+from util.Util import is_dark
+from util.Judge import RANK_NAMES
+from util.Classes import Text, HUDText, Image, Timer, ScaledSurface, TEXTURES
 
 # pygame setup
 pygame.font.init()
@@ -61,14 +63,12 @@ tuple(map(operator.sub, receptor_xy[7], (650, 0)))]
 class BG:
     def __init__(self, colour, texture):
         self.image = None
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
         
-        # fill background with given colour
-        self.image.fill(colour, special_flags=pygame.BLEND_MULT)
+        # fill background with given colour (the texture cache tints a copy, once per colour)
+        self.image = TEXTURES.get(texture, colour)
         
     def fill(self, colour, texture):
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
-        self.image.fill(colour, special_flags=pygame.BLEND_MULT)
+        self.image = TEXTURES.get(texture, colour)
         
     def update(self, surf):
         surf.blit(self.image, (0, 0))
@@ -111,19 +111,25 @@ class Receptor():
                 self.texture_string += '_dark'
         
         # load the image from the set string
-        self.image = pygame.image.load(os.path.join('assets', self.texture_string + '.png')).convert_alpha()
+        self.image = TEXTURES.get(self.texture_string)
+        self.scaled = ScaledSurface()
         self.being_pressed = False
         
+        # the rects drawn to last update (for dirty rect rendering)
+        self.drawn_rects = []
+        
         self.rect = self.image.get_rect()
         
         # create timer for holding notes
-        self.hold_timer = Text('0', (self.image.get_rect().center[0], self.image.get_rect().center[1] - 10), DETAILS_FONT, 0.6, self.default_colour)
+        self.hold_timer = HUDText('0', (self.image.get_rect().center[0], self.image.get_rect().center[1] - 10), DETAILS_FONT, 0.6, self.default_colour, atlas=True)
 
     def set_texture(self, texture):
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
+        self.image = TEXTURES.get(texture)
         
     def fill_blank(self):
+        # the texture is shared, so blank a copy of it
         transparent = Color(0, 0, 0, 0)
+        self.image = self.image.copy()
         self.image.fill(transparent)
         
     def press(self, pressed):
@@ -136,18 +142,42 @@ class Receptor():
             self.set_texture(self.texture_string)
             
     def draw(self, surf):
-        self.hold_timer.draw(surf)
+        return self.hold_timer.draw(surf)
+    
+    def draw_base(self, surf, pos):
+        # draw the unpressed receptor, no matter if it is pressed right now (for static layers)
+        return surf.blit(self.scaled.get(TEXTURES.get(self.texture_string), self.scale), pos)
             
-    def update(self, ID, hold_time, pos_list, surf):
+    def update(self, ID, hold_time, pos_list, surf, draw_base=True):
         # draw receptor assets to the screen
-        surf.blit(pygame.transform.smoothscale_by(self.image, self.scale), pos_list[ID])
+        # (if the receptor is already on a static layer, it only needs to be drawn when it looks different, like when pressed)
+        self.drawn_rects = []
+        if draw_base:
+            self.drawn_rects.append(surf.blit(self.scaled.get(self.image, self.scale), pos_list[ID]))
         
         if p_settings.getboolean('Debug', 'super debug mode'):
-            self.hold_timer = Text(f'{round(hold_time * 1000)}', (pos_list[ID]), DETAILS_FONT, 0.6, self.default_colour)
-            self.draw(surf)
+            self.hold_timer.set(f'{round(hold_time * 1000)}', pos=pos_list[ID])
+            self.drawn_rects.append(self.draw(surf))
         
         
-## the Note class will include all of the note variables to make them work correctly:
+## chart_column() makes a Note variable that is really one index of a ChartData array.
+# reading it reads the array, and setting it sets the array, so the ChartData always has the note's current state.
+#   name (name of the ChartData array)
+#   type (what to convert the value to when reading it)
+
+def chart_column(name, type):
+    def get(note):
+        return type(getattr(note.chart, name)[note.index])
+        
+    def set(note, value):
+        getattr(note.chart, name)[note.index] = value
+        
+    return property(get, set)
+
+
+## the Note class is the sprite of one note in a ChartData (the note values themselves are in the ChartData arrays):
+#   chart (the ChartData the note is in)
+#   index (the note's index in the ChartData)
 #   ID (the note's id. used for tracking when it appears in the song)
 #   recep id (similar to Receptor.id, it makes sure that the notes appear in the correct lane)
 #   ms (millisecond value, this is the time that the note is supposed to appear in the song)
@@ -159,85 +189,94 @@ class Receptor():
 #   song (the current song. Used for setting hold length ms values)
     
 class Note():
+    
+    # note data (saved in the ChartData)
+    id = chart_column('id', int)
+    recep_id = chart_column('lane', int)
+    ms = chart_column('ms', float)
+    hold_ms = chart_column('hold_ms', float)
+    beat = chart_column('beat', float)
+    alive = chart_column('alive', bool)
+    root_alive = chart_column('root_alive', bool)
+    holding = chart_column('holding', bool)
+    actually_hit = chart_column('hit', bool)
+    
+    # lane position (worked out for every note at once, see ChartData.run_calc)
+    calc = chart_column('calc', float)
 
-    def __init__(self, ID, receptor_list, recep_id, ms, hold_ms, texture, type, song):
-
-        # load settings
-        p_settings.read_file(open('config/player_settings.ini'))
+    def __init__(self, chart, index, receptor_list, song):
         
-        # create note data
-        self.id = ID
-        self.recep_id = recep_id
-        self.ms = ms
-        self.hold_ms = hold_ms
-        self.beat = 0
+        # (settings are loaded once by the NoteList, not by every note)
+        
+        # the note's place in the chart data
+        self.chart = chart
+        self.index = index
         self.step = 0
         self.start_time = 0
         
         # get image from texture string and fill with colour from player_settings
-        self.image = pygame.image.load(os.path.join('assets', texture + '.png')).convert_alpha()
-        self.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+        self.texture = chart.texture(index)
+        self.image = TEXTURES.get(self.texture, list(map(int, p_settings.get('Visual', 'note colour').split())))
         
-        # setup more variables (alive, hold notes, positions)
-        self.type = type
+        # setup more variables (hold notes, positions)
+        self.type = chart.type(index)
         self.rect = self.image.get_rect()
-        self.pos = pygame.math.Vector2()
-        self.start_pos = pygame.math.Vector2()
-        self.end_pos = pygame.math.Vector2()
         self.scale = 1
-        self.alive = True
-        self.root_alive = True
-        self.holding = False
-        self.actually_hit = False
+        self.scaled = ScaledSurface()
         self.hold_notes = []
         
-        self.start_pos.xy = (note_spawn_pos[self.recep_id])
-        self.end_pos.xy = (centerX, centerY)
-        self.pos = self.start_pos
+        # the rects drawn to last update (for dirty rect rendering)
+        self.drawn_rects = []
         
-        # setup the holding sprites of the note
-        # if the length is > 0, setup root, middle, and end hold sprites
-        self.hold_images = []
+        # setup the hold of the note
+        # if the length is > 0, setup one hold body that goes from the note to the end of the hold
         hold_ms_in_steps = int(self.hold_ms / (song.sec_per_step * 1000))
         if hold_ms_in_steps > 0:
-            for x in range(0, hold_ms_in_steps + 1):
-            
-                if x == 0:
-                    # hold root
-                    self.hold_notes.append(HoldNote(self, x, 'root', self.ms, receptor_list, recep_id, song))
-                    
-                elif x == hold_ms_in_steps:
-                    # end of hold
-                    self.hold_notes.append(HoldNote(self, x, 'end', self.ms + (song.sec_per_step * 1000) * x, receptor_list, recep_id, song))
-                    
-                else:
-                    # middle
-                    self.hold_notes.append(HoldNote(self, x, '', self.ms + (song.sec_per_step * 1000) * x, receptor_list, recep_id, song))
-        
-        self.beat_to_show = 0
-        
-        self.calc = None
-        
-        # setup the note's beat and step variables using the song sec_per_beat and step data
+            self.hold_notes.append(HoldNote(self, self.ms, self.ms + (song.sec_per_step * 1000) * hold_ms_in_steps, receptor_list, self.recep_id, song))
+        
+        # setup the note's step variable using the song step data (beats are set for every note at once, see ChartData.init_beats)
         self.init_beat_step(song)
+        
+        # if the note was already judged before this sprite was made, its hold is gone too
+        if not self.alive:
+            for hold in self.hold_notes:
+                hold.kill()
+                
+    # two sprites of the same note are the same note (a note can get a new sprite after its old one is released)
+    def __eq__(self, other):
+        return isinstance(other, Note) and other.chart is self.chart and other.index == self.index
+        
+    def __hash__(self):
+        return hash((id(self.chart), self.index))
+    
+    # screen position (also from ChartData.run_calc)
+    @property
+    def pos(self):
+        return (self.chart.x[self.index], self.chart.y[self.index])
     
     def update_colour(self):
-        self.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
+        self.image = TEXTURES.get(self.texture, list(map(int, p_settings.get('Visual', 'note colour').split())))
         
     def draw(self, surf):
-        # draw notes
+        # draw notes (and save where they were drawn)
+        self.drawn_rects = []
         for hold in self.hold_notes:
             if hold.alive:
-                hold.draw(surf)
+                self.drawn_rects += hold.draw(surf)
         
         if self.root_alive:
-            surf.blit(pygame.transform.smoothscale_by(self.image, self.scale), self.pos.xy)
+            self.drawn_rects.append(surf.blit(self.scaled.get(self.image, self.scale), self.pos))
             
     def update(self, song, surf):
         
-        # check status of holds
-        if self.hold_ms <= 0:
+        # nothing drawn yet this update
+        self.drawn_rects = []
+        
+        # check status of holds (a hold note is alive until both the root and the hold are gone)
+        if len(self.hold_notes) == 0:
             self.alive = self.root_alive
+        else:
+            self.alive = self.root_alive or any(hold.alive for hold in self.hold_notes)
         
         for hold in self.hold_notes:
             hold.update(surf, song)
@@ -246,82 +285,135 @@ class Note():
             for hold in self.hold_notes:
                 hold.run_kill(song)
         
-        # if note is alive, run the calculation to interpolate it's position.
+        # if note is alive, draw it (its position was already worked out by ChartData.run_calc)
         if self.alive:
             self.draw(surf)
-            self.run_calc(song)
-            if self.calc >= 0 and self.calc <= 1:
-                self.pos = pygame.math.Vector2(self.start_pos + (self.end_pos - self.start_pos) * self.calc)
-        
-    def run_calc(self, song):
-        # interpolate note position
-        self.beat_to_show = song.conductor.dt / song.sec_per_beat + song.beats_shown
-        self.calc = (0.87 - (self.beat - song.conductor.dt / song.sec_per_beat) / song.beats_shown)
             
     def init_beat_step(self, song):
-        self.beat = self.ms / song.sec_per_beat / 1000
         self.step = self.ms / song.sec_per_step / 1000
         
     def kill(self):
         self.alive = False
             
+    # misses are decided by the JudgementEngine (see util.Judge), which runs this on missed notes
     def kill_root(self):
         self.root_alive = False
-        
-    # handles note missing
-    def run_kill(self, song):
-        if self.root_alive:
-            if self.calc > 1:
-                self.kill_root() 
-                return True
-                
-        else:
-            return False
 
 
-## the HoldNote class is used to add sustaining data and gameplay for notes
+## the NoteList class makes note sprites just in time, and gets rid of them once they are judged.
+# a note's sprite is made when the note comes into the chart's window (within song.beats_shown beats of the conductor), and released once it is dead,
+# so only the notes that are (about to be) on screen have sprites. note_list[x] is the sprite of chart index x (made if needed).
+#   chart (the ChartData of the song)
+#   receptor list (the receptors, for hold angles)
+#   song (the current song)
+#   notes (the sprites that are alive, saved by chart index)
+#   next spawn (place in the chart's order of the next note to make a sprite for)
+#   order version (the chart's order version when next spawn was set)
+# the chart can still be getting notes added to it (see ChartStream). if they had to be sorted in, spawning starts over from the start of the order.
+
+class NoteList():
+    
+    def __init__(self, chart, receptor_list, song):
+        
+        # load settings (once, for all of the notes)
+        p_settings.read_file(open('config/player_settings.ini'))
+        
+        self.chart = chart
+        self.receptor_list = receptor_list
+        self.song = song
+        self.notes = {}
+        
+        # every lane goes from its spawn position to the middle
+        chart.set_lanes(note_spawn_pos, [(centerX, centerY)] * len(note_spawn_pos))
+        
+        self.next_spawn = 0
+        self.order_version = chart.order_version
+        
+    def __len__(self):
+        # amount of notes in the whole chart (not just the ones with sprites)
+        return len(self.chart)
+        
+    def __getitem__(self, index):
+        # get the sprite of a note, and make it if it doesn't have one yet
+        note = self.notes.get(index)
+        if note == None:
+            note = Note(self.chart, index, self.receptor_list, self.song)
+            self.notes[index] = note
+            
+        return note
+        
+    def spawn(self, song):
+        # the order was sorted again (notes were added out of order), so the place in it is no good. notes that already have sprites are skipped
+        if self.order_version != self.chart.order_version:
+            self.order_version = self.chart.order_version
+            self.next_spawn = 0
+        
+        # make sprites for the notes that came into the window since last time (the head of the window is moved by ChartData.run_calc)
+        head = self.chart.head
+        for index in self.chart.order[self.next_spawn:head]:
+            if self.chart.alive[index]:
+                self[int(index)]
+        self.next_spawn = max(self.next_spawn, head)
+            
+    def release(self, index):
+        # get rid of a judged note's sprite
+        self.notes.pop(index, None)
+        
+    def active(self):
+        # the sprites that exist right now (copied, so notes can be released while looping)
+        return list(self.notes.values())
+        
+        
+## the HoldNote class is used to add sustaining data and gameplay for notes.
+# the whole hold is one object: the root sprite is drawn at the head, the middle sprite is tiled along the part of the hold that is on screen,
+# and the end sprite is drawn at the tail. only the on-screen part is ever drawn, so long holds cost the same as short ones.
 #   parent (the parent note. use position and ms data from it)
-#   type (root, middle, or end sprite?)
-#   ms (millisecond placement of hold note piece)
+#   ms (millisecond placement of the head of the hold)
+#   end ms (millisecond placement of the tail of the hold)
 #   receptor_list (the list of receptors. used to get the angle of the receptor and rotate the sprites)
 #   recep_id (the parent_note's receptor ID. used to get angle.)
 #   song (the current song, again, for ms data)
 
 class HoldNote():
     
-    def __init__(self, parent, id, type, ms, receptor_list, recep_id, song):
+    def __init__(self, parent, ms, end_ms, receptor_list, recep_id, song):
 
-        # setup images
-        if type == 'root':
-            # hold root
-            self.image = Image('note_hold_root', parent.pos[0], parent.pos[1], 1)
-            
-        elif type == 'end':
-            # end of hold
-            self.image = Image('note_hold_end', parent.pos[0], parent.hold_notes[len(parent.hold_notes)-2].image.rect.y - 160, 1)
-            
-        else:
-            # middle
-            self.image = Image('note_hold', parent.pos[0], parent.pos[1] - 180 * id, 1)
-        
-        # fill from player_settings
-        self.image.image.fill(list(map(int, p_settings.get('Visual', 'note colour').split())), special_flags=pygame.BLEND_MULT)
-        
-        # rotate hold images
+        # hold images are rotated to the receptor angle
         recep = receptor_list.get(f'receptor{recep_id}')
         self.recep = recep
-        self.image.image = pygame.transform.rotate(self.image.image, recep.angle)
+        
+        # setup images (filled with colour from player_settings). tinted and rotated sprites are shared by every hold (see bake_hold_sprites)
+        colour = list(map(int, p_settings.get('Visual', 'note colour').split()))
+        
+        self.root_image = Image('note_hold_root', parent.pos[0], parent.pos[1], 1, colour=colour, angle=recep.angle)
+        self.body_image = Image('note_hold', parent.pos[0], parent.pos[1], 1, colour=colour, angle=recep.angle)
+        self.end_image = Image('note_hold_end', parent.pos[0], parent.pos[1], 1, colour=colour, angle=recep.angle)
+        
+        # diagonal sprites are bigger once rotated, so move them back a bit to line up with the note
+        self.offset = 0
+        if self.recep.angle == 45 or self.recep.angle == -45 or self.recep.angle == -135 or self.recep.angle == -225:
+            self.offset = -15
         
         # setup more variables
         self.alive = True
         self.ms = ms
+        self.end_ms = end_ms
         self.recep_id = recep_id
         
-        self.calc = None
+        self.parent = parent
+        self.chart = parent.chart
         
-        self.init_beat_step(song)
+        # how far apart (in calc) the middle sprites are, so they line up end to end (the unrotated sprite length along the lane)
+        self.spacing = TEXTURES.get('note_hold').get_height() / max(self.chart.lane_length(recep_id), 1)
         
-        self.parent = parent
+    # lane position of the head and the tail (worked out for every hold at once, see ChartData.run_calc)
+    @property
+    def calc(self):
+        return float(self.chart.calc[self.parent.index])
+        
+    @property
+    def end_calc(self):
+        return float(self.chart.end_calc[self.parent.index])
         
     def kill(self):
         self.alive = False
@@ -329,48 +421,69 @@ class HoldNote():
     # handles killing while holding
     def run_kill(self, song):
         if self.alive:
-            # if calculation hits a good looking point
-            if self.calc > 0.87:
+            # if the tail hits a good looking point, the whole hold has been held
+            if self.end_calc > 0.87:
                 self.kill() 
                 return True
                 
         else:
             return False
+    
+    def blit(self, image, x, y, surf):
+        image.xpos = x + self.offset
+        image.ypos = y + self.offset
+        return image.draw(surf)
         
     def draw(self, surf):
-        self.image.draw(surf)
+        # returns the rects that were drawn to
+        rects = []
+        calc = self.calc
+        end_calc = self.end_calc
+        
+        # while being held, the hold gets eaten up at the receptor
+        head = calc
+        if self.parent.holding and self.parent.actually_hit:
+            head = min(head, 0.87)
+        
+        # hold root
+        if 0 <= calc <= 1 and head == calc:
+            rects.append(self.blit(self.root_image, *self.chart.lerp(self.recep_id, calc), surf))
+        
+        # middle, tiled from the tail (or the edge of the screen) up to the head. never more sprites than fit on the lane.
+        # every middle sprite's position is worked out at once
+        xs, ys = self.chart.lerp(self.recep_id, np.arange(max(end_calc, 0), min(head, 1), self.spacing))
+        for x, y in zip(xs, ys):
+            rects.append(self.blit(self.body_image, x, y, surf))
+        
+        # end of hold
+        if 0 <= end_calc <= 1 and end_calc <= head:
+            rects.append(self.blit(self.end_image, *self.chart.lerp(self.recep_id, end_calc), surf))
+        
+        return rects
         
     def update(self, surf, song):
         
-        # if alive, run calc to interpolate position
+        # if alive, check where the tail is (calc is worked out by ChartData.run_calc)
         if self.alive:
-            self.run_calc(song)
-            if self.calc != None:
-                if self.calc >= 0 and self.calc <= 1:
-                    if self.recep.angle == 45 or self.recep.angle == -45 or self.recep.angle == -135 or self.recep.angle == -225:
-                        self.image.xpos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc) + pygame.math.Vector2(-15, -15)
-                        self.image.ypos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc) + pygame.math.Vector2(-15, -15)
-                    
-                    else:
-                        self.image.xpos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc)
-                        self.image.ypos = pygame.math.Vector2(self.parent.start_pos + (self.parent.end_pos - self.parent.start_pos) * self.calc)
-                        
-                else:
-                    
-                    # make sure that you can't see long hold notes while they are not being moved
-                    self.image.xpos = 1280
-                    self.image.ypos = 720
-            
-    def run_calc(self, song):
-        # run calc
-        self.beat_to_show = song.conductor.dt / song.sec_per_beat + song.beats_shown
-        self.calc = (0.87 - (self.beat - song.conductor.dt / song.sec_per_beat) / song.beats_shown)
             
-    def init_beat_step(self, song):
-        self.beat = self.ms / song.sec_per_beat / 1000
-        self.step = self.ms / song.sec_per_step / 1000
+            # the tail has gone past the end of the lane (missed and scrolled away), so there is nothing left to show
+            if self.end_calc > 1:
+                self.kill()
         
         
+## bake_hold_sprites() tints and rotates the root, middle, and end hold sprites for every lane angle before any notes are made.
+# every HoldNote / ChartHoldNote then just grabs the baked sprites from the texture cache.
+#   angles (the angle of each lane)
+#   colour (note colour)
+
+HOLD_TEXTURES = ['note_hold_root', 'note_hold', 'note_hold_end']
+
+def bake_hold_sprites(angles, colour):
+    for angle in angles:
+        for texture in HOLD_TEXTURES:
+            TEXTURES.get(texture, colour, angle)
+            
+            
 ## the Song class will be used to handle all of the music playing and tracking related aspects of the project
 #   path (the song path to load)
 #   tag (the id3 tag of the song)
@@ -504,79 +617,46 @@ class Song():
             self.conductor.start(self.pause_time)
 
 
-## calc_note_data handles displaying the ranking of the current note that you just hit.
-# it will show your offset ms, and then find what that rank is by comparing it to the database
+## show_judgement handles displaying the ranking of the current note that you just hit.
+# it will show your offset ms and the rank (the JudgementEngine has already decided the rank and scored it, this only draws it)
+# returns (the ms text, or None if show ms is off, the rank text)
+#   hit ms (offset ms of the hit, None if it was a miss)
+#   rank (the rank of the hit, see util.Judge)
 
-def calc_note_data(hit_ms, acc_database, note_list, rank_text):
-    
-    # if the rank text is given, make it alive
-    if rank_text != None:
-        rank_text.alive = True
-    
-    # setup colour variables
-    rank_colours = [(0, 255, 0), (255, 69, 0), (255, 0, 0), (139, 0, 0), (139, 0, 0)]
-    rank_colours_light = [(214, 255, 214), (255, 167, 135), (255, 170, 170), (139, 0, 0)]
-    col_to_use = None
-    
-    ## the ranks are calculated based off of your accuracy in specific millisecond ranges. The ranges are listed below.
-    ## the function compares your ms accuracy to the accuracy ranges, and sets the rank accordingly.
-    
-    # perfect = 50
-    # great = 100
-    # good = 116.67
-    # bad = 133.33
-    ranks = [50, 100, 116.67, 133.3]
-    
-    # iterate through possible ranks to give based on ms accuracy
-    i = 0
-    if hit_ms != None:
-        for x in ranks:
-            
-            # compare the user's ms accuracy to the list of possible ranks (using compare from range)
-            rank = compare_from_range(0, abs(hit_ms), x)
-            
-            # set the actual rank
-            if rank:
-                break
-            
-            # iterate through to next rank (if next rank is not "miss", that is handeled outside)
-            if i + 1 != 4:
-                i += 1
-    else:
-        # if else, you missed (skill issue + l + fell off)
-        i = 4
+# setup colour variables
+RANK_COLOURS = [(0, 255, 0), (255, 69, 0), (255, 0, 0), (139, 0, 0), (139, 0, 0)]
+RANK_COLOURS_LIGHT = [(214, 255, 214), (255, 167, 135), (255, 170, 170), (139, 0, 0)]
+
+# the ms offset text is reused for every hit (drawn from a glyph atlas, since it changes every hit)
+MS_TEXT = HUDText('', (centerX + 35, centerY + 55), DETAILS_FONT, 1, (0, 0, 0), 'center', True, True)
+
+# one rank text for each rank, rendered once and reused for every hit
+RANK_TEXTS = [Text(RANK_NAMES[x], (centerX + 65, centerY + 35), RATINGS_FONT, 0.2, RANK_COLOURS[x], 'center', True) for x in range(0, len(RANK_NAMES))]
+
+def show_judgement(hit_ms, rank):
     
     # setup rank text with correct colour
-    print('Rank:', i)
-    if i <= len(ranks)-1:
-        
-        # add the hit rank to the list of current rank values
-        acc_database[i] += 1
-        
-        col_to_use = rank_colours_light[i]
-        display_ms = Text('{} ms.'.format(str(hit_ms)), (centerX + 35, centerY + 55), DETAILS_FONT, 1, col_to_use, 'center', True)
+    if hit_ms != None:
+        MS_TEXT.set('{} ms.'.format(str(hit_ms)), RANK_COLOURS_LIGHT[rank], (centerX + 35, centerY + 55))
     
     # if you missed, don't display ms text
-    if hit_ms == None:
-        display_ms = Text('', (centerX + 35, centerY + 45), DETAILS_FONT, 1, (0, 0, 0), 'center', True)
+    else:
+        MS_TEXT.set('', (0, 0, 0), (centerX + 35, centerY + 45))
         
-    # now it's time to copy osu's ranking formula and calc the average accuracy! thanks ppy!
-    # https://osu.ppy.sh/wiki/en/Gameplay/Accuracy#osu!mania
-    
-    n = len(note_list)
-    a = acc_database
-    accuracy = (300 * (n + a[0]) + 200 * (a[1]) + 100 * (a[2]) + 50 * (a[3])) / (300 * (n + a[0] + a[1] + a[2] + a[3] + a[4]))
+    MS_TEXT.alive = True
+    display_ms = MS_TEXT
     
-    # setup the rank image
-    rating_strings = ['Perfect!', 'Great!', 'Good!', 'Bad', 'Miss']
-    display_txt = Text(rating_strings[i], (centerX + 65, centerY + 35), RATINGS_FONT, 0.2, rank_colours[i], 'center', True)
+    # setup the rank text (back to its starting size for the tween)
+    display_txt = RANK_TEXTS[rank]
+    display_txt.scale = 0.2
+    display_txt.alive = True
     
     # if show ms is false, don't display it
     if not p_settings.getboolean('Visual', 'show ms'):
         display_ms = None
     
     # return all
-    return display_ms, accuracy, display_txt
+    return display_ms, display_txt
     
 
 ## play_intro(), used to play gameplay intro
@@ -606,6 +686,10 @@ def play_intro(assets, the_tween, starting, surf):
 #   I will use time.get_fps() to display the current FPS
 #   I will use a library called "psutil" to display RAM usage
 #   colours will change depending on current FPS and RAM
+# the text objects are made once here and are drawn from a glyph atlas (no font.render at all)
+
+FPS_TEXT = HUDText('0 FPS', (1275, 5), DETAILS_FONT, 1, (0, 255, 0), 'topright', True, True)
+MEM_TEXT = HUDText('0 GB', (1280, FPS_TEXT.rect.y + 24), DETAILS_FONT, 0.9, (250, 250, 250), 'topright', True, True)
 
 def fps_display(surf, clock):
     
@@ -626,18 +710,29 @@ def fps_display(surf, clock):
         # red text
         fps_state = (255, 0, 0)
     
-    # create text objects
-    fps_text = Text(str(int(current_fps)) + ' FPS', (1275, 5), DETAILS_FONT, 1, (fps_state), 'topright', True)
-    mem_text = Text(str(int(current_ram)) + ' GB', (1280, fps_text.rect.y + 24), DETAILS_FONT, 0.9, (250, 250, 250), 'topright', True)
+    # update text objects
+    FPS_TEXT.set(str(int(current_fps)) + ' FPS', fps_state)
+    MEM_TEXT.set(str(int(current_ram)) + ' GB')
         
     # draw text
-    fps_text.draw(surf)
-    mem_text.draw(surf)
+    FPS_TEXT.draw(surf)
+    MEM_TEXT.draw(surf)
     
 
 ## song_data_display will display current step and beat
 # for all intents and purposes, exactly the same as fps_display. just using it for debugging (and to look cool heh)
 
+# beat, step, and ms text for each mode. game mode goes in the top left, chart mode goes in the top right
+SONG_DATA_TEXTS = {
+    'game': [HUDText('0', (5, 5), DETAILS_FONT, 1, (250, 250, 250), 'topleft', True, True),
+             HUDText('0', (5, 29), DETAILS_FONT, 0.9, (250, 250, 250), 'topleft', True, True),
+             HUDText('0', (5, 53), DETAILS_FONT, 0.8, (250, 250, 250), 'topleft', True, True)],
+    'chart': [HUDText('0', (GAME_RECT.topright[0] - 4, 5), DETAILS_FONT, 1, (250, 250, 250), 'topright', True, True),
+              HUDText('0', (GAME_RECT.topright[0] - 1, 29), DETAILS_FONT, 0.9, (250, 250, 250), 'topright', True, True),
+              HUDText('0', (GAME_RECT.topright[0] + 5, 53), DETAILS_FONT, 0.8, (250, 250, 250), 'topright', True, True)]
+}
+ACC_TEXT = HUDText('0.00%', (1270, 100), DETAILS_FONT, 1, (250, 250, 250), 'midright', True, True)
+
 def song_data_display(song, acc_database, accuracy, mode, surf):
 
     # read settings
@@ -655,21 +750,15 @@ def song_data_display(song, acc_database, accuracy, mode, surf):
         cur_step = song.pos_in_steps
         cur_ms = song.conductor.dt * 1000
     
-    # if game mode, put it in top left of screen
-    if mode == 'game':
-        beat_text = Text(str(int(cur_beat)), (5, 5), DETAILS_FONT, 1, (250, 250, 250), 'topleft', True)
-        step_text = Text(str(int(cur_step)), (5, beat_text.rect.y + 24), DETAILS_FONT, 0.9, (250, 250, 250), 'topleft', True)
-        ms_text = Text(str(int(cur_ms)), (5, step_text.rect.y + 24), DETAILS_FONT, 0.8, (250, 250, 250), 'topleft', True)
-        
-    elif mode == 'chart':
-        # else if chart mode, go in top right
-        beat_text = Text(str(int(cur_beat)), (surf.get_rect().topright[0] - 4, 5), DETAILS_FONT, 1, (250, 250, 250), 'topright', True)
-        step_text = Text(str(int(cur_step)), (surf.get_rect().topright[0] - 1, beat_text.rect.y + 24), DETAILS_FONT, 0.9, (250, 250, 250), 'topright', True)
-        ms_text = Text(str(int(cur_ms)), (surf.get_rect().topright[0] + 5, step_text.rect.y + 24), DETAILS_FONT, 0.8, (250, 250, 250), 'topright', True)
+    # update beat, step, and ms text for the current mode
+    [beat_text, step_text, ms_text] = SONG_DATA_TEXTS[mode]
+    beat_text.set(str(int(cur_beat)))
+    step_text.set(str(int(cur_step)))
+    ms_text.set(str(int(cur_ms)))
     
     # display accuracy if not in chart mode
     if mode != 'chart':
-        acc_text = Text('{:.2f}%'.format(accuracy * 100), (1270, 100), DETAILS_FONT, 1, (250, 250, 250), 'midright', True)
+        ACC_TEXT.set('{:.2f}%'.format(accuracy * 100))
     
     # if debug mode or chart mode, draw text
     if p_settings.getboolean('Debug', 'debug mode') or mode == 'chart':
@@ -683,22 +772,18 @@ def song_data_display(song, acc_database, accuracy, mode, surf):
     
     # if not chart mode, draw accuracy
     if mode != 'chart':
-        acc_text.draw(surf)
+        ACC_TEXT.draw(surf)
 
 
 ## song_hit_data_display() shows how many of each note rating you have hit (perfect, good, bad, etc.)
+
+# one text object for each rating, using the accuracy database values as reference
+HIT_DATA_STRINGS = ['Perfects: ', 'Greats: ', 'Goods: ', 'Bads: ', 'Misses: ']
+HIT_DATA_TEXTS = [HUDText(HIT_DATA_STRINGS[x] + '0', (1285, centerY - 50 + x * 25), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True) for x in range(0, 5)]
+
 def song_hit_data_display(acc_database, surf):
 
-    # make text objects, using the accuracy database values as reference
-    perf_text = Text('Perfects: ' + str(acc_database[0]), (1285, centerY - 50), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True)
-    great_text = Text('Greats: ' + str(acc_database[1]), (1285, centerY - 25), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True)
-    good_text = Text('Goods: ' + str(acc_database[2]), (1285, centerY), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True)
-    bad_text = Text('Bads: ' + str(acc_database[3]), (1285, centerY + 25), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True)
-    miss_text = Text('Misses: ' + str(acc_database[4]), (1285, centerY + 50), DETAILS_FONT, 0.8, (250, 250, 250), 'midright', True)
-    
-    # draw text
-    perf_text.draw(surf)
-    great_text.draw(surf)
-    good_text.draw(surf)
-    bad_text.draw(surf)
-    miss_text.draw(surf)
\ No newline at end of file
+    # update and draw text
+    for x in range(0, len(HIT_DATA_TEXTS)):
+        HIT_DATA_TEXTS[x].set(HIT_DATA_STRINGS[x] + str(acc_database[x]))
+        HIT_DATA_TEXTS[x].draw(surf)
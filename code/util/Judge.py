@@ -0,0 +1,348 @@
+'''*************************************************************************
+Name: Judge
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file contains the judgement engine. It is given the notes of a chart and timestamped key presses / releases,
+                     and decides which notes were hit (and how well), which holds were held, and which notes were missed.
+                     There is no pygame (or drawing of any kind) in here, so charts can be judged without a window.
+                     The Judgement, ScoreState, and JudgementEngine classes, and the rank_of and calc_accuracy functions are here.
+********************************************************************'''
+
+import math
+from collections import deque
+from bisect import bisect_left, bisect_right
+
+# a note can be hit from this many ms before its time...
+HIT_EARLY = 250
+
+# ...until this many ms after it
+HIT_LATE = 133.33
+
+# the ms ranges of each rank (perfect, great, good, bad). hits outside of all of them (early ones) are bad
+RANK_WINDOWS = [50, 100, 116.67, 133.3]
+RANK_NAMES = ['Perfect!', 'Great!', 'Good!', 'Bad', 'Miss']
+PERFECT, GREAT, GOOD, BAD, MISS = range(0, 5)
+
+# how much each rank is worth in the accuracy formula
+RANK_POINTS = [300, 200, 100, 50, 0]
+
+# a hold can be let go this many ms before its end and still count
+HOLD_LENIENCY = 100
+
+# notes this close (in ms) to the first note of a chord are part of the chord
+CHORD_RANGE = 250
+
+
+# the rank of a hit that was offset ms away from the note (offset is positive if early)
+def rank_of(offset):
+    # the first window that the offset fits in (bad if it doesn't fit in any)
+    return min(bisect_left(RANK_WINDOWS, abs(offset)), BAD)
+
+
+## calc_accuracy() is osu!mania's accuracy formula (https://osu.ppy.sh/wiki/en/Gameplay/Accuracy#osu!mania)
+#   counts (how many of each rank, [perfect, great, good, bad, miss])
+#   note count (how many notes are in the chart)
+
+def calc_accuracy(counts, note_count):
+    n = note_count
+    a = counts
+    return (300 * (n + a[0]) + 200 * (a[1]) + 100 * (a[2]) + 50 * (a[3])) / (300 * (n + a[0] + a[1] + a[2] + a[3] + a[4]))
+
+
+## the ScoreState class keeps the score of a chart, and is updated by each judgement as it happens. nothing is ever added up again,
+# so scoring a hit takes the same (tiny) amount of time on the first note as on the thousandth. it only keeps numbers, drawing them is up to the game.
+# accuracy is calc_accuracy(), but with its top and bottom kept as running totals.
+# the mean and variance of the hit error are kept with Welford's method (https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Welford's_online_algorithm)
+#   note count (how many notes are in the chart)
+#   counts (how many of each rank, [perfect, great, good, bad, miss])
+#   judged (how many notes have been scored)
+#   points (the RANK_POINTS of every scored note, added up)
+#   hits (how many scored notes have an offset (every rank but miss))
+#   mean error (the average offset of the hits, in ms (positive if early))
+#   error m2 (the sum of the squared differences from the mean error, for the variance)
+
+class ScoreState():
+
+    def __init__(self, note_count=0):
+        self.note_count = note_count
+        self.counts = [0, 0, 0, 0, 0]
+        self.judged = 0
+        self.points = 0
+
+        self.hits = 0
+        self.mean_error = 0
+        self.error_m2 = 0
+
+    def add(self, rank, offset=None):
+        # score a note. offset is how many ms early it was hit (None for misses)
+        self.counts[rank] += 1
+        self.judged += 1
+        self.points += RANK_POINTS[rank]
+
+        if offset != None:
+            self.hits += 1
+            delta = offset - self.mean_error
+            self.mean_error += delta / self.hits
+            self.error_m2 += delta * (offset - self.mean_error)
+
+    @property
+    def accuracy(self):
+        # 0 until something has been scored
+        if self.judged == 0:
+            return 0
+        return (300 * self.note_count + self.points) / (300 * (self.note_count + self.judged))
+
+    @property
+    def error_variance(self):
+        if self.hits < 2:
+            return 0
+        return self.error_m2 / (self.hits - 1)
+
+    @property
+    def error_deviation(self):
+        return math.sqrt(self.error_variance)
+
+
+## the Judgement class is one decision made by the JudgementEngine:
+#   kind ('hit' = a note was hit, 'hold' = a hold note was hit and is now being held (not scored yet),
+#         'release' = a hold was let go (scored with the rank of the press, or a miss if it was let go too early), 'miss' = a note went by)
+#   index (the note's index in the chart)
+#   lane (the note's lane)
+#   rank (PERFECT, GREAT, GOOD, BAD, or MISS)
+#   offset (how many ms early the note was hit (negative if late). None for misses)
+#   time (the time it happened, in song ms)
+
+class Judgement():
+
+    __slots__ = ('kind', 'index', 'lane', 'rank', 'offset', 'time')
+
+    def __init__(self, kind, index, lane, rank, offset, time):
+        self.kind = kind
+        self.index = index
+        self.lane = lane
+        self.rank = rank
+        self.offset = offset
+        self.time = time
+
+    def __repr__(self):
+        return f'Judgement({self.kind}, note {self.index}, lane {self.lane}, {RANK_NAMES[self.rank]}, {self.offset} ms)'
+
+
+## the JudgementEngine class judges a chart. notes are kept in one queue per lane (in ms order), so a press only looks at the front of its lane.
+# notes are grouped into chords when they are added. like always, a chord can only be hit once every note before it has been judged
+# (or is too late to hit. those notes are missed by advance() later on, but they don't hold the next chord back until then).
+# all times are song ms (the same as the notes' ms).
+#   key count (how many lanes there are)
+#   miss after (how many ms after its time a note is missed. in gameplay, this is when it goes past the end of the lane)
+#   ms / lane / hold ms (the values of each note, by chart index)
+#   judged (has each note been judged (hit or missed)?)
+#   order (note indexes sorted by ms) and sorted ms (the ms of the notes in that order, kept in step with it for finding chords)
+#   chords (the chord each note is in) and chord starts (where each chord starts in the order)
+#   lane queues (the notes that haven't been judged yet, one queue per lane)
+#   holding (the hold note being held in each lane, as (index, offset of the press), or None)
+#   judged count (how many notes have been judged)
+#   next open (place in the order of the first note that might still be hit (not judged, and not more than HIT_LATE ms old))
+#   next miss (place in the order of the first note that might still be missed)
+#   score (the ScoreState, updated with every scored judgement)
+
+class JudgementEngine():
+
+    def __init__(self, key_count=8, miss_after=HIT_LATE):
+        self.key_count = key_count
+        self.miss_after = miss_after
+
+        self.ms = []
+        self.lane = []
+        self.hold_ms = []
+        self.judged = []
+
+        self.order = []
+        self.sorted_ms = []
+        self.chords = []
+        self.chord_starts = []
+
+        self.lane_queues = [deque() for x in range(0, key_count)]
+        self.holding = [None] * key_count
+
+        self.judged_count = 0
+        self.next_open = 0
+        self.next_miss = 0
+        self.score = ScoreState()
+
+    @classmethod
+    def from_chart(cls, chart, key_count=8, miss_after=HIT_LATE):
+        # a judge for a ChartData (or anything with ms, lane, and hold_ms lists)
+        judge = cls(key_count, miss_after)
+        judge.add_chart_notes(chart)
+        return judge
+
+    @property
+    def count(self):
+        return len(self.ms)
+
+    @property
+    def counts(self):
+        return self.score.counts
+
+    @property
+    def accuracy(self):
+        return self.score.accuracy
+
+    def add_chart_notes(self, chart):
+        # add the notes of the chart that the judge doesn't have yet (charts that are still being read get more notes)
+        start = self.count
+        self.add_notes([float(x) for x in chart.ms[start:]], [int(x) for x in chart.lane[start:]], [float(x) for x in chart.hold_ms[start:]])
+
+    def add_notes(self, ms, lanes, hold_ms):
+        # add notes to the end of the chart. their indexes carry on from the notes already added
+        start = self.count
+        self.ms += ms
+        self.lane += lanes
+        self.hold_ms += hold_ms
+        self.judged += [False] * len(ms)
+        self.score.note_count = self.count
+
+        new_order = sorted(range(start, self.count), key=lambda x: self.ms[x])
+        if len(new_order) == 0:
+            return
+
+        # charts are (almost always) in order, so the new notes just go on the end. if not, everything is sorted again
+        if len(self.order) > 0 and self.ms[new_order[0]] < self.ms[self.order[-1]]:
+            self.rebuild()
+            return
+
+        self.order += new_order
+        self.sorted_ms += [self.ms[index] for index in new_order]
+        self.chords += [0] * len(new_order)
+        self.group_chords(max(len(self.chord_starts) - 1, 0))
+
+        for index in new_order:
+            self.lane_queues[self.lane[index]].append(index)
+
+    def rebuild(self):
+        # sort every note again and put the ones that haven't been judged back in their lanes
+        self.order = sorted(range(0, self.count), key=lambda x: self.ms[x])
+        self.sorted_ms = [self.ms[index] for index in self.order]
+        self.chords = [0] * self.count
+        self.chord_starts = []
+        self.group_chords()
+
+        self.lane_queues = [deque() for x in range(0, self.key_count)]
+        for index in self.order:
+            if not self.judged[index]:
+                self.lane_queues[self.lane[index]].append(index)
+
+        self.next_open = 0
+        self.next_miss = 0
+
+    def group_chords(self, first_chord=0):
+        # group the notes into chords, from chord first_chord onward (a chord is every note up to CHORD_RANGE ms after its first note)
+        if first_chord < len(self.chord_starts):
+            pos = self.chord_starts[first_chord]
+        else:
+            pos = 0
+        del self.chord_starts[first_chord:]
+
+        sorted_ms = self.sorted_ms
+        while pos < len(self.order):
+            self.chord_starts.append(pos)
+            end = bisect_right(sorted_ms, sorted_ms[pos] + CHORD_RANGE, pos)
+            for x in range(pos, end):
+                self.chords[self.order[x]] = len(self.chord_starts) - 1
+            pos = end
+
+    def open_chord(self, time):
+        # the last chord that can be hit right now (the chord of the first note that hasn't been judged and isn't too late to hit)
+        order = self.order
+        late = time - HIT_LATE
+        while self.next_open < len(order):
+            index = order[self.next_open]
+            if not self.judged[index] and self.ms[index] > late:
+                return self.chords[index]
+            self.next_open += 1
+
+        return len(self.chord_starts)
+
+    def judge(self, kind, index, rank, offset, time):
+        # make a judgement, and count it if it is scored
+        if kind != 'release':
+            self.judged[index] = True
+            self.judged_count += 1
+
+        if kind != 'hold':
+            self.score.add(rank, offset)
+
+        return Judgement(kind, index, self.lane[index], rank, offset, time)
+
+    def press(self, lane, time):
+        # a key was pressed. returns the Judgement, or None if there was nothing to hit
+        if self.holding[lane] != None:
+            return None
+
+        # notes that were judged, or that are too late to hit, are skipped (they are missed by advance())
+        ms = self.ms
+        judged = self.judged
+        lane_queue = self.lane_queues[lane]
+        late = time - HIT_LATE
+        while len(lane_queue) > 0 and (judged[lane_queue[0]] or ms[lane_queue[0]] <= late):
+            lane_queue.popleft()
+
+        if len(lane_queue) == 0:
+            return None
+
+        index = lane_queue[0]
+        offset = ms[index] - time
+        if offset >= HIT_EARLY or self.chords[index] > self.open_chord(time):
+            return None
+
+        lane_queue.popleft()
+
+        if self.hold_ms[index] > 0:
+            self.holding[lane] = (index, offset)
+            return self.judge('hold', index, rank_of(offset), offset, time)
+
+        return self.judge('hit', index, rank_of(offset), offset, time)
+
+    def release(self, lane, time):
+        # a key was let go. returns the Judgement of the hold that was let go, or None if nothing was being held
+        if self.holding[lane] == None:
+            return None
+
+        index, offset = self.holding[lane]
+        self.holding[lane] = None
+
+        # held for long enough? (from when it was pressed)
+        if time - (self.ms[index] - offset) < self.hold_ms[index] - HOLD_LENIENCY:
+            return self.judge('release', index, MISS, None, time)
+
+        return self.judge('release', index, rank_of(offset), offset, time)
+
+    def advance(self, time):
+        # miss every note that went by without being hit. returns their Judgements
+        missed = []
+        order = self.order
+        sorted_ms = self.sorted_ms
+        last_ms = time - self.miss_after
+        while self.next_miss < len(order) and sorted_ms[self.next_miss] < last_ms:
+            index = order[self.next_miss]
+            if not self.judged[index]:
+                missed.append(self.judge('miss', index, MISS, None, time))
+            self.next_miss += 1
+
+        return missed
+
+    def process(self, events):
+        # judge a list of (time, lane, pressed) input events (in time order). yields every Judgement made
+        for time, lane, pressed in events:
+            # (only look for misses if the next note has gone by. for nearly every event, it hasn't)
+            if self.next_miss < len(self.sorted_ms) and self.sorted_ms[self.next_miss] < time - self.miss_after:
+                for judgement in self.advance(time):
+                    yield judgement
+
+            if pressed:
+                judgement = self.press(lane, time)
+            else:
+                judgement = self.release(lane, time)
+
+            if judgement != None:
+                yield judgement
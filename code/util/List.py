@@ -11,6 +11,7 @@ import pygame
 from pygame.locals import *
 
 from util.Classes import Text, Button
+from util.Sound import SOUNDS
 
 # init fonts
 pygame.font.init()
@@ -139,7 +140,7 @@ class SongList():
         
         if self.hovering != self.was_hovering and self.hovering:
             # play hover sound
-            pygame.mixer.Sound('sounds/hover.wav').play()
+            SOUNDS.play('hover')
 
         self.was_hovering = self.hovering
         
@@ -166,7 +167,7 @@ class SongList():
                         self.open = not self.open
                         
                         # play interacting sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
                         
                     elif self.play_button.hovering:
                         print('ya')
@@ -174,10 +175,10 @@ class SongList():
                         # this is done in list_main()
                         
                         # play interacting sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
                     
                     elif not self.hovering:
                         self.open = False
                         
                         # play interacting sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
\ No newline at end of file
+                        SOUNDS.play('interact')
\ No newline at end of file
@@ -12,6 +12,7 @@ from pygame.locals import *
 
 from util.Classes import Text, Image, Button
 from util.Util import is_dark
+from util.Sound import SOUNDS
 
 # init fonts
 pygame.font.init()
@@ -309,7 +310,7 @@ class Option():
                     if event.button == 1:
 
                         # play interaction sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
 
                         if self.type == 'bool':
                             # swap bool from false to true or vice versa
@@ -371,7 +372,7 @@ class Option():
                     if self.typing:
 
                         # play interaction sound
-                        pygame.mixer.Sound('sounds/interact.wav').play()
+                        SOUNDS.play('interact')
 
                         # if you are typing and option is keybind option:
                         if self.type == 'keybind':
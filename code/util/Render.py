@@ -0,0 +1,131 @@
+'''*************************************************************************
+Name: Render
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file contains the classes that control how frames are pushed to the screen.
+                     The DirtyRenderer, SpriteBatch, and StaticLayer classes are here.
+********************************************************************'''
+
+import pygame
+from pygame.locals import *
+
+## the DirtyRenderer class keeps track of which parts of the screen changed this frame, and only pushes those parts to the display.
+# everything is still drawn to DISPLAYSURF like normal. the only difference is that pygame.display.update() gets a list of rects
+# (the changed rects from this frame AND last frame, so anything that moved or disappeared gets cleaned up) instead of the whole screen.
+# anything that changes the whole screen (transitions, the pause menu, scrolling menus) calls full() to push everything for that frame.
+#   enabled (is dirty rect rendering on? if not, the whole screen is pushed every frame, like always)
+#   screen rect (the rect of the screen, used to clip rects that go off-screen)
+#   rects (the rects that changed this frame)
+#   prev rects (the rects that changed last frame)
+#   full frame (push the whole screen this frame?)
+
+class DirtyRenderer():
+
+    def __init__(self, enabled, screen_rect):
+        self.enabled = enabled
+        self.screen_rect = pygame.Rect(screen_rect)
+
+        self.rects = []
+        self.prev_rects = []
+
+        # the first frame of a scene is always pushed in full
+        self.full_frame = True
+
+    def add(self, rect):
+        # draw functions return None if nothing was drawn
+        if rect != None:
+            rect = self.screen_rect.clip(rect)
+            if rect.w > 0 and rect.h > 0:
+                self.rects.append(rect)
+
+    def add_all(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def full(self):
+        self.full_frame = True
+
+    def present(self):
+        if not self.enabled or self.full_frame:
+            # push the whole screen
+            pygame.display.update()
+
+        else:
+            # push what changed this frame and what changed last frame
+            rects = self.rects + self.prev_rects
+            if len(rects) > 0:
+                pygame.display.update(rects)
+
+        # get ready for the next frame
+        self.prev_rects = self.rects
+        self.rects = []
+        self.full_frame = False
+
+
+## the SpriteBatch class collects blits and draws all of them with one Surface.blits() call, instead of one blit() call each.
+# it has blit() and blits() functions just like a surface, so it can be passed to any draw / update function in place of the screen.
+# blits are drawn in the same order that they were added.
+#   blits (the (surface, position) or (surface, position, area) blits to draw)
+
+class SpriteBatch():
+
+    def __init__(self):
+        self.blits_to_draw = []
+
+    def blit(self, source, dest, area=None):
+        # save the blit for later
+        if area == None:
+            self.blits_to_draw.append((source, dest))
+            size = source.get_size()
+        else:
+            area = pygame.Rect(area)
+            self.blits_to_draw.append((source, dest, area))
+            size = area.size
+
+        # return the rect that will be drawn to (like surf.blit does)
+        return pygame.Rect(dest, size)
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = [self.blit(*blit) for blit in blit_sequence]
+
+        if doreturn:
+            return rects
+
+    def flush(self, surf):
+        # draw everything in one go and start over
+        if len(self.blits_to_draw) > 0:
+            surf.blits(self.blits_to_draw, doreturn=False)
+        self.blits_to_draw = []
+
+
+## the StaticLayer class is a surface of things that don't move (backgrounds, HUD boxes, etc.), drawn onto it once.
+# the layer is only rebuilt when its key changes. the key should be made of every setting that changes how the layer looks,
+# so changing one of those settings rebuilds it, and nothing else does.
+#   size (the size of the layer surface)
+#   image (the layer surface)
+#   key (the key the layer was last built with)
+#   rects (the parts of the layer that were drawn on. only these parts are blitted)
+
+class StaticLayer():
+
+    def __init__(self, size):
+        self.size = size
+        self.image = None
+        self.key = None
+        self.rects = []
+
+    def update(self, key, build):
+        # rebuild the layer if the key changed. build(surf) draws the layer and returns the rects it drew
+        # returns True if the layer was rebuilt
+        if self.image == None or key != self.key:
+            self.image = pygame.Surface(self.size, pygame.SRCALPHA, 32)
+            self.rects = [pygame.Rect(rect) for rect in build(self.image) if rect != None]
+            self.key = key
+            return True
+
+        return False
+
+    def draw(self, surf):
+        # blit only the parts that were drawn on
+        surf.blits([(self.image, rect.topleft, rect) for rect in self.rects], doreturn=False)
+        return self.rects
@@ -0,0 +1,170 @@
+'''*************************************************************************
+Name: Sound
+Date: Jan. 20, 2023
+Course: Sun West DLC Computer Science 20
+Program Description: This file contains the sound bank that every sound effect in the game is played through.
+                     SoundBank, DummyMixer, DummySound, DummyChannel, and the shared SOUNDS bank are here.
+********************************************************************'''
+
+# pygame is only needed for the real mixer. the DummyMixer below works without it (for testing)
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+## the SoundBank class loads every sound effect once, and plays them on mixer channels that are reserved for each category.
+# hitsounds get their own channels, so a burst of hits never cuts off the ui sounds (or the other way around).
+#   mixer (pygame.mixer, or a DummyMixer for testing)
+#   paths (the file path of each sound, saved by name)
+#   categories (which category each sound plays in)
+#   channel counts (how many channels each category reserves)
+#   sounds (the loaded sounds)
+#   channels (the reserved channels of each category)
+#   next channel (if every channel in a category is busy, which one gets cut off next. goes round and round)
+#   loaded (are the sounds loaded and the channels reserved?)
+
+class SoundBank():
+
+    def __init__(self, mixer=None):
+        self.mixer = mixer
+
+        self.paths = {}
+        self.categories = {}
+        self.channel_counts = {}
+
+        self.sounds = {}
+        self.channels = {}
+        self.next_channel = {}
+        self.loaded = False
+
+    def add_category(self, category, channel_count):
+        self.channel_counts[category] = channel_count
+
+    def add(self, name, path, category):
+        # sounds are only loaded when load() is run (the mixer has to be started first)
+        self.paths[name] = path
+        self.categories[name] = category
+
+    def load(self):
+        if self.mixer == None:
+            self.mixer = pygame.mixer
+
+        # reserve the first channels for the categories, and leave the usual 8 free for everything else
+        reserved = sum(self.channel_counts.values())
+        if self.mixer.get_num_channels() < reserved + 8:
+            self.mixer.set_num_channels(reserved + 8)
+        self.mixer.set_reserved(reserved)
+
+        # give each category its own block of channels
+        index = 0
+        for category, channel_count in self.channel_counts.items():
+            self.channels[category] = [self.mixer.Channel(index + x) for x in range(0, channel_count)]
+            self.next_channel[category] = 0
+            index += channel_count
+
+        # load each sound from disk (only happens once!)
+        for name, path in self.paths.items():
+            self.sounds[name] = self.mixer.Sound(path)
+
+        self.loaded = True
+
+    def play(self, name):
+        if not self.loaded:
+            self.load()
+
+        sound = self.sounds[name]
+        category = self.categories[name]
+        channels = self.channels[category]
+
+        # play on a free channel in the category if there is one
+        for channel in channels:
+            if not channel.get_busy():
+                channel.play(sound)
+                return channel
+
+        # else cut off the next one in line
+        channel = channels[self.next_channel[category]]
+        self.next_channel[category] = (self.next_channel[category] + 1) % len(channels)
+        channel.play(sound)
+        return channel
+
+
+## the DummyMixer class acts like pygame.mixer (just the parts that SoundBank uses), without pygame or a sound device.
+# instead of playing sounds, it keeps a list of which sound was played on which channel.
+#   num channels (amount of channels)
+#   reserved (amount of reserved channels)
+#   channels (the channels that have been made, saved by id)
+#   played (a list of (channel id, sound path) for each sound played)
+
+class DummyMixer():
+
+    def __init__(self):
+        self.num_channels = 8
+        self.reserved = 0
+        self.channels = {}
+        self.played = []
+
+    def get_num_channels(self):
+        return self.num_channels
+
+    def set_num_channels(self, count):
+        self.num_channels = count
+
+    def set_reserved(self, count):
+        self.reserved = count
+
+    def Sound(self, path):
+        return DummySound(path)
+
+    def Channel(self, id):
+        if id not in self.channels:
+            self.channels[id] = DummyChannel(self, id)
+        return self.channels[id]
+
+
+## the DummySound class is a sound that was "loaded" by a DummyMixer
+#   path (the sound's file path)
+
+class DummySound():
+
+    def __init__(self, path):
+        self.path = path
+
+
+## the DummyChannel class is a channel of a DummyMixer. a channel stays busy until stop() is called.
+#   mixer (the DummyMixer it belongs to)
+#   id (channel id)
+#   busy (is a sound "playing"?)
+
+class DummyChannel():
+
+    def __init__(self, mixer, id):
+        self.mixer = mixer
+        self.id = id
+        self.busy = False
+
+    def play(self, sound):
+        self.busy = True
+        self.mixer.played.append((self.id, sound.path))
+
+    def get_busy(self):
+        return self.busy
+
+    def stop(self):
+        self.busy = False
+
+
+# the sound bank that the whole game plays through. main.py loads it right after pygame is started.
+SOUNDS = SoundBank()
+
+SOUNDS.add_category('hitsounds', 6)
+SOUNDS.add_category('metronome', 1)
+SOUNDS.add_category('ui', 3)
+SOUNDS.add_category('menus', 2)
+
+SOUNDS.add('hitsound', 'sounds/hitsound.wav', 'hitsounds')
+SOUNDS.add('metronome', 'sounds/metronome.wav', 'metronome')
+SOUNDS.add('hover', 'sounds/hover.wav', 'ui')
+SOUNDS.add('interact', 'sounds/interact.wav', 'ui')
+SOUNDS.add('transition', 'sounds/transition.wav', 'menus')
+SOUNDS.add('intro', 'sounds/intro.wav', 'menus')